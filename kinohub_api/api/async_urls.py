@@ -0,0 +1,13 @@
+from django.urls import path
+
+from .async_views import comment_list, review_list, title_detail, title_list
+
+urlpatterns = [
+    path('v1/titles/', title_list),
+    path('v1/titles/<int:pk>/', title_detail),
+    path('v1/titles/<int:title_id>/reviews/', review_list),
+    path(
+        'v1/titles/<int:title_id>/reviews/<int:review_id>/comments/',
+        comment_list,
+    ),
+]
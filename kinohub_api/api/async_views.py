@@ -0,0 +1,193 @@
+"""
+Асинхронные версии горячих GET-эндпоинтов для запуска под ASGI.
+
+Попадание в кеш каталога в памяти процесса отдаётся прямо в цикле
+событий, без перехода в поток, сетевой кеш читается в потоке.
+В Django 3.2 нет асинхронного ORM (aget и aiterator появились в 4.1),
+поэтому запрос к БД и сериализация выполняются одним вызовом
+sync_to_async на запрос. Запросы, которые здесь не поддержаны (запись,
+поиск, сортировка, курсорная пагинация, browsable API, неверные
+параметры фильтра), передаются обычным представлениям DRF. Им же
+передаются все запросы, если включены лимиты anon или user: проверяют
+их троттлинги DRF.
+"""
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from reviews.models import Comment, Review, Title
+from .cache import (call_cache, is_not_modified, lookup, set_cache_headers,
+                    store)
+from .fast_serializers import (FastCommentSerializer, FastReviewSerializer,
+                               FastTitleSerializer)
+from .filters import TitleFilter
+from .renderers import FastJSONRenderer
+from .routers import read_from, recently_written
+from .serializers import TitleSerializer
+from .views import CommentViewSet, ReviewViewSet, TitleViewSet
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update',
+                  'patch': 'partial_update', 'delete': 'destroy'}
+
+drf_title_list = TitleViewSet.as_view(LIST_ACTIONS)
+drf_title_detail = TitleViewSet.as_view(DETAIL_ACTIONS)
+drf_review_list = ReviewViewSet.as_view(LIST_ACTIONS)
+drf_comment_list = CommentViewSet.as_view(LIST_ACTIONS)
+
+PAGE_PARAMS = {PageNumberPagination.page_query_param}
+TITLE_LIST_PARAMS = PAGE_PARAMS | set(TitleFilter.base_filters)
+INVALID_PAGE = {'detail': PageNumberPagination.invalid_page_message}
+NOT_FOUND = {'detail': NotFound.default_detail}
+
+
+# Лимиты, которые DRF применяет к спискам и карточкам каталога
+THROTTLED = any(api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+                for scope in ('anon', 'user'))
+
+
+def is_native(request, allowed_params):
+    return (not THROTTLED
+            and request.method == 'GET'
+            and set(request.GET) <= allowed_params
+            and 'text/html' not in request.headers.get('Accept', ''))
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status,
+                        content_type='application/json')
+
+
+def paginate(request, queryset, serializer_class):
+    """Страница в формате PageNumberPagination или None."""
+    paginator = Paginator(queryset, settings.REST_FRAMEWORK['PAGE_SIZE'])
+    try:
+        page = paginator.page(
+            request.GET.get(PageNumberPagination.page_query_param, 1))
+    except InvalidPage:
+        return None
+    url = request.build_absolute_uri()
+    param = PageNumberPagination.page_query_param
+    previous_url = None
+    if page.has_previous():
+        number = page.previous_page_number()
+        previous_url = (remove_query_param(url, param) if number == 1
+                        else replace_query_param(url, param, number))
+    return OrderedDict([
+        ('count', paginator.count),
+        ('next', replace_query_param(url, param, page.next_page_number())
+         if page.has_next() else None),
+        ('previous', previous_url),
+        ('results', serializer_class(page.object_list, many=True).data),
+    ])
+
+
+def load_title_page(request):
+    titles = TitleFilter(request.GET, TitleViewSet.queryset.all()).qs
+    # Как CachedListMixin: ответ попадёт в кеш, а реплика сразу
+    # после записи может отставать
+    with read_from(replica=not recently_written()):
+        return paginate(request, FastTitleSerializer.values(titles),
+                        FastTitleSerializer)
+
+
+def load_title(pk):
+    return TitleSerializer(get_object_or_404(
+        TitleViewSet.queryset.all(), pk=pk)).data
+
+
+def check_parent(data, parent):
+    """Как ParentCheckMixin: родитель проверяется для пустой страницы."""
+    if data is not None and not data['results'] and not parent.exists():
+        raise Http404
+    return data
+
+
+def load_review_page(request, title_id):
+    reviews = Review.objects.filter(title_id=title_id).order_by(
+        *ReviewViewSet.ordering)
+    return check_parent(
+        paginate(request, FastReviewSerializer.values(reviews),
+                 FastReviewSerializer),
+        Title.objects.filter(id=title_id))
+
+
+def load_comment_page(request, title_id, review_id):
+    comments = Comment.objects.filter(review_id=review_id,
+                                      review__title_id=title_id)
+    return check_parent(
+        paginate(request, FastCommentSerializer.values(comments),
+                 FastCommentSerializer),
+        Review.objects.filter(id=review_id, title_id=title_id))
+
+
+async def title_list(request):
+    # Проверка формы фильтра не обращается к БД; ошибку в параметрах
+    # DRF вернёт как 400, в кеш она не попадёт
+    if (not is_native(request, TITLE_LIST_PARAMS)
+            or not TitleFilter(request.GET).is_valid()):
+        return await sync_to_async(drf_title_list)(request)
+    alias = settings.API_CACHE_ALIAS
+    key, cached = await call_cache(alias, lookup, request)
+    if cached is None:
+        data = await sync_to_async(load_title_page)(request)
+        if data is None:
+            return json_response(INVALID_PAGE, status=404)
+        etag = await call_cache(alias, store, key, data)
+    else:
+        data, etag = cached
+    if is_not_modified(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        response = json_response(data)
+    return set_cache_headers(response, etag, cached is not None)
+
+
+async def title_detail(request, pk):
+    if not is_native(request, set()):
+        return await sync_to_async(drf_title_detail)(request, pk=pk)
+    try:
+        return json_response(await sync_to_async(load_title)(pk))
+    except Http404:
+        return json_response(NOT_FOUND, status=404)
+
+
+async def review_list(request, title_id):
+    if not is_native(request, PAGE_PARAMS):
+        return await sync_to_async(drf_review_list)(
+            request, title_id=title_id)
+    try:
+        data = await sync_to_async(load_review_page)(request, title_id)
+    except Http404:
+        return json_response(NOT_FOUND, status=404)
+    if data is None:
+        return json_response(INVALID_PAGE, status=404)
+    return json_response(data)
+
+
+async def comment_list(request, title_id, review_id):
+    if not is_native(request, PAGE_PARAMS):
+        return await sync_to_async(drf_comment_list)(
+            request, title_id=title_id, review_id=review_id)
+    try:
+        data = await sync_to_async(load_comment_page)(
+            request, title_id, review_id)
+    except Http404:
+        return json_response(NOT_FOUND, status=404)
+    if data is None:
+        return json_response(INVALID_PAGE, status=404)
+    return json_response(data)
+
+
+# Проверку CSRF делают представления DRF, которым передаются запросы
+# на запись; csrf_exempt из Django 3.2 не поддерживает корутины
+for view in (title_list, title_detail, review_list, comment_list):
+    view.csrf_exempt = True
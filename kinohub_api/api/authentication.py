@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import CustomUser
+
+USER_CLAIMS = ('username', 'role', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Токен, который несёт в себе всё нужное для проверки прав."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['username'] = user.username
+        # У несохранённого пользователя роль может быть элементом Status
+        token['role'] = str(user.role)
+        token['is_superuser'] = user.is_superuser
+        return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    На чтение обычного пользователя собирает из полей токена без
+    запроса к БД. Для записи и для модераторов и администраторов
+    пользователь загружается из БД и кешируется на
+    AUTH_USER_CACHE_TIMEOUT секунд, кеш сбрасывается при изменении
+    и удалении пользователя. С общим кешем (REDIS_URL) понижение роли,
+    блокировка и удаление действуют сразу, без него остальные воркеры
+    видят прежнего пользователя до истечения AUTH_USER_CACHE_TIMEOUT.
+    """
+
+    def authenticate(self, request):
+        self.trust_claims = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Токен не содержит идентификатор пользователя')
+
+        if (getattr(self, 'trust_claims', False)
+                and all(claim in validated_token for claim in USER_CLAIMS)
+                and validated_token['role'] == CustomUser.Status.USER.value
+                and not validated_token['is_superuser']):
+            user = CustomUser(
+                id=user_id,
+                is_active=True,
+                **{claim: validated_token[claim] for claim in USER_CLAIMS})
+            user._state.adding = False
+            user.is_token_user = True
+            return user
+
+        cache = caches[settings.API_CACHE_ALIAS]
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
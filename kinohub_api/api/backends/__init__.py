@@ -0,0 +1,31 @@
+"""
+Бэкенды баз данных с проверкой сохранённых соединений,
+как CONN_HEALTH_CHECKS в Django 4.1.
+"""
+
+
+class HealthCheckMixin:
+    """
+    В начале запроса сохранённое соединение помечается непроверенным
+    и проверяется при первом обращении к базе в этом запросе:
+    оборванное закрывается, и запрос откроет новое вместо ошибки.
+    Соединения, к которым запрос не обращается, не проверяются.
+    """
+    health_check_done = True
+
+    def request_started(self):
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            self.health_check_done = False
+
+    def connect(self):
+        # Новое соединение проверять незачем
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        if not self.health_check_done:
+            self.health_check_done = True
+            if (self.connection is not None and not self.in_atomic_block
+                    and not self.is_usable()):
+                self.close()
+        super().ensure_connection()
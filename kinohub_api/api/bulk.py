@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from reviews.signals import catalog_changed
+
+
+class BulkCreateMixin:
+    """
+    POST <список>/bulk/ со списком объектов. Элементы проверяются
+    сериализатором по одному, уникальные поля и связи — одним запросом
+    IN на всю пачку, корректные пишутся одной транзакцией.
+    Ошибки возвращаются по каждому элементу: 201 — сохранены все,
+    207 — часть, 400 — ни одного.
+    """
+    bulk_serializer_class = None
+    # Поле, уникальность которого проверяется на всю пачку
+    bulk_unique_field = None
+
+    @action(detail=False, methods=('POST',))
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список объектов']})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {settings.BULK_MAX_ITEMS} объектов за запрос']})
+
+        context = self.get_serializer_context()
+        valid, errors = {}, {}
+        for index, item in enumerate(items):
+            serializer = self.bulk_serializer_class(data=item,
+                                                    context=context)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        errors.update(self.validate_bulk(valid))
+        for index in errors:
+            valid.pop(index, None)
+
+        created = {}
+        if valid:
+            try:
+                with transaction.atomic():
+                    created = dict(zip(
+                        valid, self.create_bulk(list(valid.values()))))
+            except IntegrityError:
+                # Параллельный запрос успел занять уникальное значение
+                raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Пачка пересеклась с параллельной записью, '
+                    'повторите запрос']})
+
+        results = [
+            {'status': status.HTTP_201_CREATED,
+             'data': self.bulk_serializer_class(
+                 created[index], context=context).data}
+            if index in created else
+            {'status': status.HTTP_400_BAD_REQUEST, 'errors': errors[index]}
+            for index in range(len(items))]
+        if not errors:
+            code = status.HTTP_201_CREATED
+        elif created:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(results, status=code)
+
+    def validate_bulk(self, items):
+        """
+        Проверки, которым нужна вся пачка. items — {индекс: validated_data}
+        прошедших сериализатор, возвращает {индекс: ошибки}.
+        """
+        field = self.bulk_unique_field
+        if field is None:
+            return {}
+        model = self.bulk_serializer_class.Meta.model
+        taken = set(model.objects.filter(**{
+            f'{field}__in': [data[field] for data in items.values()]
+        }).values_list(field, flat=True))
+        errors = {}
+        for index, data in items.items():
+            # Повтор внутри пачки тоже ошибка, сохраняется первый
+            if data[field] in taken:
+                errors[index] = {field: [UniqueValidator.message]}
+            taken.add(data[field])
+        return errors
+
+    def create_bulk(self, items):
+        """Сохраняет проверенные элементы, возвращает объекты по порядку."""
+        model = self.bulk_serializer_class.Meta.model
+        objects = model.objects.bulk_create(
+            [model(**data) for data in items])
+        # bulk_create не шлёт post_save, кеш каталога сбрасываем сами
+        catalog_changed.send(sender=model)
+        return objects
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .routers import read_from, recently_written
+
+VERSION_KEY = 'catalog:version'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+async def call_cache(alias, func, *args):
+    """
+    Вызывает из цикла событий func, которая обращается к кешу alias.
+    Кеш в памяти процесса не блокирует цикл и читается прямо в нём,
+    сетевой (Redis) — в потоке через sync_to_async.
+    """
+    if isinstance(caches[alias], LocMemCache):
+        return func(*args)
+    return await sync_to_async(func)(*args)
+
+
+def get_catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Версия из времени, чтобы после вытеснения ключа
+        # не воскресить старые записи
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_catalog():
+    """Сбрасывает все закешированные ответы каталога разом."""
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def count(result):
+    with _stats_lock:
+        _stats[result] += 1
+
+
+def cache_stats():
+    """Счётчики попаданий и промахов в текущем процессе."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def make_key(request):
+    query = sorted(request.GET.lists())
+    raw = f'{request.path}?{query}'.encode()
+    return (f'catalog:{get_catalog_version()}:'
+            f'{hashlib.md5(raw).hexdigest()}')
+
+
+def make_etag(data):
+    raw = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+    return f'"{hashlib.md5(raw).hexdigest()}"'
+
+
+def lookup(request):
+    """Ключ кеша для запроса и закешированные (data, etag) или None."""
+    key = make_key(request)
+    cached = get_cache().get(key)
+    count('misses' if cached is None else 'hits')
+    return key, cached
+
+
+def store(key, data):
+    etag = make_etag(data)
+    get_cache().set(key, (data, etag), settings.API_CACHE_TIMEOUT)
+    return etag
+
+
+def is_not_modified(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return etag in (tag.strip() for tag in if_none_match.split(','))
+
+
+def set_cache_headers(response, etag, hit):
+    response['ETag'] = etag
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+class CachedListMixin:
+    """
+    Кеширует данные ответа list() до ближайшего изменения каталога
+    и отвечает 304 на If-None-Match с совпадающим ETag.
+    Ответ одинаков для всех пользователей, поэтому годится
+    только для публичных списков.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key, cached = lookup(request)
+        if cached is None:
+            # Сразу после записи реплика может отставать, а ответ
+            # попадёт в кеш надолго: читаем с default
+            with read_from(replica=not recently_written()):
+                response = super().list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data, etag = response.data, store(key, response.data)
+        else:
+            data, etag = cached
+        if is_not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        return set_cache_headers(response, etag, cached is not None)
@@ -0,0 +1,149 @@
+"""
+Сериализаторы списков только для чтения. Нужные колонки берутся
+из базы через values(), словари собираются напрямую, без экземпляров
+моделей и полей DRF. Вывод совпадает с обычными сериализаторами,
+что проверяет python -m benchmarks.serializers.
+"""
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from reviews.models import Title
+
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+def datetime_formatter():
+    """
+    Функция форматирования дат как у DateTimeField. Текущая зона
+    определяется один раз на страницу: её поиск дороже форматирования.
+    """
+    if api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return DATETIME_FIELD.to_representation
+    zone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_datetime(value):
+        if zone is not None:
+            value = value.astimezone(zone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_datetime
+
+
+class FastSerializer(ABC):
+    """Интерфейс как у сериализатора с many=True: rows -> .data."""
+    columns = ()
+
+    def __init__(self, rows, many=True):
+        self.rows = rows
+        self.format_datetime = datetime_formatter()
+
+    @classmethod
+    def values(cls, queryset):
+        # prefetch_related не работает со словарями из values()
+        return queryset.prefetch_related(None).values(*cls.columns)
+
+    @abstractmethod
+    def to_representation(self, row):
+        """Словарь ответа для одной строки из values()."""
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+
+class FastTitleSerializer(FastSerializer):
+    """Как TitleSerializer, жанры страницы одним запросом."""
+    columns = ('id', 'category__name', 'category__slug', 'reviews_count',
+               'name', 'year', 'description', 'rating')
+
+    def __init__(self, rows, many=True):
+        super().__init__(rows, many)
+        self.genres = {}
+
+    def get_genres(self, title_ids):
+        genres = defaultdict(list)
+        # Порядок как у prefetch_related('genre'): Genre.Meta.ordering
+        for title_id, name, slug in Title.genre.through.objects.filter(
+                title_id__in=title_ids).order_by('-genre_id').values_list(
+                'title_id', 'genre__name', 'genre__slug'):
+            genres[title_id].append({'name': name, 'slug': slug})
+        return genres
+
+    @property
+    def data(self):
+        self.rows = list(self.rows)
+        self.genres = self.get_genres([row['id'] for row in self.rows])
+        return super().data
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'category': {'name': row['category__name'],
+                         'slug': row['category__slug']},
+            'genre': self.genres.get(row['id'], []),
+            'reviews_count': row['reviews_count'],
+            'name': row['name'],
+            'year': row['year'],
+            'description': row['description'],
+            'rating': row['rating'],
+        }
+
+
+class FastReviewSerializer(FastSerializer):
+    """Как ReviewSerializer."""
+    columns = ('id', 'author__username', 'score', 'title__name', 'text',
+               'pub_date', 'comments_count')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'author': row['author__username'],
+            'score': row['score'],
+            'title': row['title__name'],
+            'text': row['text'],
+            'pub_date': self.format_datetime(row['pub_date']),
+            'comments_count': row['comments_count'],
+        }
+
+
+class FastCommentSerializer(FastSerializer):
+    """Как CommentSerializer."""
+    columns = ('id', 'text', 'author__username', 'pub_date')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'pub_date': self.format_datetime(row['pub_date']),
+        }
+
+
+class FastListMixin:
+    """
+    list() через fast_serializer_class, когда ответ рендерится в JSON.
+    Для browsable API и без fast_serializer_class — обычный list().
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.fast_serializer_class
+        if (serializer_class is None
+                or not isinstance(request.accepted_renderer, JSONRenderer)):
+            return super().list(request, *args, **kwargs)
+        queryset = serializer_class.values(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serializer_class(queryset).data)
+        return self.get_paginated_response(serializer_class(page).data)
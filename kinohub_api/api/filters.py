@@ -1,6 +1,9 @@
 import django_filters
+from django.db.models import Case, IntegerField, Subquery, When
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
-from reviews.models import Title
+from reviews.models import Category, Genre, Review, Title, TitleRanking
+from reviews.search import search_review_ids, search_title_ids
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -10,3 +13,73 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = ['year', 'category', 'genre', 'name']
+
+
+class SearchOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter, который при ?search= не применяет сортировку
+    вида по умолчанию: выдача остаётся упорядоченной по релевантности,
+    пока другую сортировку не запросили явно.
+    """
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(
+                FullTextSearchFilter.search_param, '').strip():
+            return None
+        return super().get_default_ordering(view)
+
+
+class TitleOrderingFilter(SearchOrderingFilter):
+    """
+    OrderingFilter с ?ordering=top: по байесовскому рейтингу из таблицы
+    лидеров жанра или категории из фильтра, иначе всего каталога.
+    """
+    top_ordering = 'top'
+    # Параметр фильтра, таблица лидеров и модель для поиска по slug
+    scopes = (
+        ('genre', TitleRanking.GENRE, Genre),
+        ('category', TitleRanking.CATEGORY, Category),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        if (request.query_params.get(self.ordering_param)
+                != self.top_ordering):
+            return super().filter_queryset(request, queryset, view)
+        kind, scope_id = TitleRanking.ALL, 0
+        for param, scope_kind, model in self.scopes:
+            slug = request.query_params.get(param)
+            if slug:
+                kind = scope_kind
+                scope_id = Subquery(
+                    model.objects.filter(slug=slug).values('pk'))
+                break
+        return queryset.filter(
+            rankings__kind=kind, rankings__scope_id=scope_id).order_by(
+            '-rankings__weighted_rating', '-rankings__title_id')
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по параметру ?search=.
+    Результаты упорядочены по релевантности.
+    """
+    search_param = 'search'
+
+    def get_ranked_ids(self, query, queryset, view):
+        if queryset.model is Title:
+            return search_title_ids(query)
+        if queryset.model is Review:
+            return search_review_ids(query, view.kwargs.get('title_id'))
+        raise TypeError(f'Поиск по {queryset.model.__name__} не настроен')
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        ids = self.get_ranked_ids(query, queryset, view)
+        if not ids:
+            return queryset.none()
+        position = Case(
+            *[When(pk=pk, then=index) for index, pk in enumerate(ids)],
+            output_field=IntegerField())
+        return queryset.filter(pk__in=ids).order_by(position)
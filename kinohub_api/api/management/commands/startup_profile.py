@@ -0,0 +1,111 @@
+import collections
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Запускается в отдельном процессе, чтобы мерить запуск с чистого листа
+CHILD = '''
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+booted = time.perf_counter()
+if sys.argv[1] == '1':
+    from kinohub_api.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+requests = []
+if sys.argv[2]:
+    from django.test import RequestFactory
+    environ = RequestFactory().get(sys.argv[2]).environ
+    for _ in range(2):
+        begin = time.perf_counter()
+        response = application(dict(environ), lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        requests.append((time.perf_counter() - begin) * 1000)
+print(json.dumps({
+    'boot': (booted - started) * 1000,
+    'warmup': (warmed - booted) * 1000,
+    'requests': requests,
+    'modules': len(sys.modules),
+}))
+'''
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| +(\S+)$')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет запуск воркера в отдельном процессе: время '
+            'создания WSGI-приложения, прогрева и первого запроса '
+            'и время импорта по модулям (python -X importtime).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=30,
+                            help='Сколько самых долгих модулей показать.')
+        parser.add_argument(
+            '--sort', choices=('cumulative', 'self'), default='cumulative',
+            help='cumulative — вместе с вложенными импортами.')
+        parser.add_argument('--by-package', action='store_true',
+                            help='Суммировать время по пакетам верхнего '
+                                 'уровня.')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Не выполнять прогрев.')
+        parser.add_argument(
+            '--url',
+            help=('Замерить первый и второй GET-запрос на этот адрес; '
+                  'запрос идёт в настроенную базу.'))
+
+    def run_child(self, options, *flags):
+        result = subprocess.run(
+            [sys.executable, *flags, '-c', CHILD,
+             '0' if options['no_warmup'] else '1', options['url'] or ''],
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+            env=dict(os.environ), check=False)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return result
+
+    def handle(self, *args, **options):
+        # Время импорта мерится отдельным запуском: -X importtime
+        # замедляет импорт и исказил бы время запуска
+        phases = json.loads(self.run_child(options).stdout.splitlines()[-1])
+        imports = [
+            (match.group(3), int(match.group(1)) / 1000,
+             int(match.group(2)) / 1000)
+            for match in map(IMPORT_TIME.match, self.run_child(
+                options, '-X', 'importtime').stderr.splitlines())
+            if match]
+
+        self.stdout.write(f'Запуск WSGI-приложения: {phases["boot"]:.1f} мс')
+        if not options['no_warmup']:
+            self.stdout.write(f'Прогрев: {phases["warmup"]:.1f} мс')
+        if options['url']:
+            first, second = phases['requests']
+            self.stdout.write(f'Первый запрос {options["url"]}: '
+                              f'{first:.1f} мс, второй: {second:.1f} мс')
+        self.stdout.write(
+            f'Модулей: {phases["modules"]}, время импорта: '
+            f'{sum(own for _, own, _ in imports):.1f} мс\n')
+
+        if options['by_package']:
+            packages = collections.Counter()
+            for name, own, _ in imports:
+                packages[name.split('.')[0]] += own
+            self.stdout.write(f'{"мс":>9}  пакет')
+            for name, total in packages.most_common(options['limit']):
+                self.stdout.write(f'{total:9.1f}  {name}')
+            return
+        column = 2 if options['sort'] == 'cumulative' else 1
+        imports.sort(key=lambda row: row[column], reverse=True)
+        self.stdout.write(f'{"всего, мс":>10} {"свой, мс":>9}  модуль')
+        for name, own, cumulative in imports[:options['limit']]:
+            self.stdout.write(f'{cumulative:10.1f} {own:9.1f}  {name}')
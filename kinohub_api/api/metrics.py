@@ -0,0 +1,128 @@
+"""
+Гистограммы времени ответа и запросов к базе по маршрутам
+и их выдача в формате Prometheus на /metrics.
+Значения хранятся в памяти процесса: каждый воркер отдаёт свои.
+"""
+import bisect
+import hmac
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from users.mail import queue_metrics
+from .cache import cache_stats
+
+PREFIX = 'kinohub'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+# Имя, описание и границы корзин гистограмм запросов
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Полное время обработки запроса', SECONDS_BUCKETS),
+    'db_queries': (
+        'Число запросов к базе за один запрос', QUERIES_BUCKETS),
+    'db_duration_seconds': (
+        'Время запросов к базе за один запрос', SECONDS_BUCKETS),
+    'render_duration_seconds': (
+        'Время рендеринга готовых данных ответа в JSON', SECONDS_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Гистограммы по имени метрики и меткам (маршрут, метод)."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, values):
+        with self._lock:
+            for name, value in values.items():
+                key = (name, labels)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(
+                        HISTOGRAMS[name][1])
+                histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (description, _) in HISTOGRAMS.items():
+                metric = f'{PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {description}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (key, labels), histogram in sorted(
+                        self._histograms.items()):
+                    if key != name:
+                        continue
+                    lines.extend(render_histogram(metric, labels, histogram))
+        return lines
+
+
+def format_labels(labels, **extra):
+    route, method = labels
+    pairs = {'route': route, 'method': method, **extra}
+    return ','.join(f'{key}="{value}"' for key, value in pairs.items())
+
+
+def render_histogram(metric, labels, histogram):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + ('+Inf',),
+                            histogram.counts):
+        cumulative += count
+        yield (f'{metric}_bucket{{{format_labels(labels, le=bound)}}} '
+               f'{cumulative}')
+    yield f'{metric}_sum{{{format_labels(labels)}}} {histogram.sum}'
+    yield f'{metric}_count{{{format_labels(labels)}}} {histogram.count}'
+
+
+def render_gauges():
+    lines = []
+    for result, value in cache_stats().items():
+        metric = f'{PREFIX}_cache_{result}_total'
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {value}')
+    for name, value in queue_metrics().items():
+        metric = f'{PREFIX}_mail_queue_{name}'
+        lines.append(f'# TYPE {metric} gauge')
+        lines.append(f'{metric} {value}')
+    return lines
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """Метрики отдаются только по METRICS_TOKEN, без настройки их нет."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    expected = f'Bearer {token}'
+    if not hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(),
+            expected.encode()):
+        return HttpResponseForbidden()
+    lines = registry.render() + render_gauges()
+    return HttpResponse('\n'.join(lines) + '\n', content_type=CONTENT_TYPE)
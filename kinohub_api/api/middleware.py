@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import call_cache
+from .metrics import registry
+from .routers import is_sticky, mark_written, read_from, replica_aliases
+
+logger = logging.getLogger(__name__)
+
+_current_tracker = ContextVar('query_tracker', default=None)
+
+
+class QueryTracker:
+    """Обёртка execute: число, суммарное время и текст запросов к базе."""
+
+    def __init__(self):
+        self.queries = []
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.duration += elapsed
+            self.queries.append((elapsed, sql))
+
+    @contextmanager
+    def installed(self):
+        # Соединения в ASGI живут в потоках sync_to_async, поэтому
+        # трекер ищется через контекст, а не ставится на соединения.
+        # Потоковый ответ могут дочитывать в другом контексте, где
+        # reset по токену невозможен
+        previous = _current_tracker.get()
+        _current_tracker.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracker.set(previous)
+
+
+def track_queries(execute, sql, params, many, context):
+    """Обёртка каждого соединения: передаёт запрос трекеру запроса."""
+    tracker = _current_tracker.get()
+    if tracker is None:
+        return execute(sql, params, many, context)
+    return tracker(execute, sql, params, many, context)
+
+
+def install_query_tracking(connection):
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+class AsyncCapableMiddleware:
+    """
+    Основа для middleware, которое работает и в WSGI, и в ASGI без
+    переключения в поток: __acall__ вызывается, если следующий
+    обработчик в цепочке асинхронный. Без переопределения handle
+    и __acall__ запрос передаётся дальше как есть.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Записывает по маршруту запроса число и время запросов к базе,
+    время рендеринга в JSON и полное время ответа.
+    Медленные запросы логируются вместе с их SQL.
+    Потоковые ответы учитываются после отдачи последнего фрагмента.
+    """
+
+    def handle(self, request):
+        started = time.perf_counter()
+        tracker = QueryTracker()
+        with tracker.installed():
+            response = self.get_response(request)
+        return self.finish(request, response, started, tracker)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        tracker = QueryTracker()
+        with tracker.installed():
+            response = await self.get_response(request)
+        return self.finish(request, response, started, tracker)
+
+    def finish(self, request, response, started, tracker):
+        if response.streaming:
+            response.streaming_content = self.track_stream(
+                response.streaming_content, request, response, started,
+                tracker)
+        else:
+            self.record(request, response, started, tracker)
+        return response
+
+    def track_stream(self, content, request, response, started, tracker):
+        try:
+            with tracker.installed():
+                yield from content
+        finally:
+            self.record(request, response, started, tracker)
+
+    def record(self, request, response, started, tracker):
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unmatched', request.method)
+        values = {
+            'request_duration_seconds': duration,
+            'db_queries': len(tracker.queries),
+            'db_duration_seconds': tracker.duration,
+        }
+        if hasattr(request, '_render_duration'):
+            values['render_duration_seconds'] = request._render_duration
+        registry.observe(labels, values)
+
+        if duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            log_slow_request(request, response, values, tracker)
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после этого хука
+        started = time.perf_counter()
+
+        def finish(rendered):
+            request._render_duration = time.perf_counter() - started
+
+        response.add_post_render_callback(finish)
+        return response
+
+
+def log_slow_request(request, response, values, tracker):
+    slowest = sorted(tracker.queries, reverse=True)[
+        :settings.METRICS_SLOW_REQUEST_QUERIES]
+    logger.warning(
+        'Медленный запрос %s %s: %d, %.0f мс, запросов к базе %d '
+        '(%.0f мс)%s',
+        request.method, request.get_full_path(), response.status_code,
+        values['request_duration_seconds'] * 1000, values['db_queries'],
+        values['db_duration_seconds'] * 1000,
+        ''.join(f'\n  {elapsed * 1000:.1f} мс: {sql}'
+                for elapsed, sql in slowest))
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Разрешает чтение с реплик безопасным запросам пользователей,
+    которые ничего не записывали последние REPLICA_STICKY_SECONDS.
+    Без реплик в DATABASES ничего не делает.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = bool(replica_aliases())
+
+    def handle(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        if request.method in SAFE_METHODS:
+            with read_from(replica=not is_sticky(request)):
+                return self.get_response(request)
+        response = self.get_response(request)
+        if response.status_code < 400:
+            mark_written(request)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        if request.method in SAFE_METHODS:
+            sticky = await call_cache(DEFAULT_CACHE_ALIAS, is_sticky, request)
+            with read_from(replica=not sticky):
+                return await self.get_response(request)
+        response = await self.get_response(request)
+        if response.status_code < 400:
+            await call_cache(DEFAULT_CACHE_ALIAS, mark_written, request)
+        return response
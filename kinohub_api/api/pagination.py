@@ -0,0 +1,59 @@
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """
+    Пагинация по курсору (pub_date, id): без COUNT(*) и OFFSET,
+    глубокие страницы отдаются так же быстро, как первая.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        # Курсор однозначен только на (pub_date, id): сортировка из
+        # ?ordering= и порядок релевантности поиска здесь не применяются
+        return self.ordering
+
+
+class CursorPaginationMixin:
+    """
+    Включает пагинацию по курсору по параметру ?pagination=cursor,
+    по умолчанию остаётся постраничная пагинация.
+    Ссылки next/previous сохраняют параметр.
+    """
+    cursor_pagination_class = PubDateCursorPagination
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and self.request.query_params.get('pagination') == 'cursor'):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+
+class ParentCheckMixin:
+    """
+    Для вложенных списков, которые фильтруются по id родителя из URL
+    без его загрузки: существование родителя проверяется отдельным
+    запросом, только если страница пуста.
+    """
+    parent_model = None
+    # Поле родителя -> именованный аргумент из URL
+    parent_lookups = {}
+
+    def parent_exists(self):
+        assert self.parent_model is not None and self.parent_lookups, (
+            f'{self.__class__.__name__} должен задать parent_model '
+            f'и parent_lookups.')
+        return self.parent_model.objects.filter(**{
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.parent_lookups.items()}).exists()
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page and not self.parent_exists():
+            raise NotFound
+        return page
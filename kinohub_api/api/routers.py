@@ -0,0 +1,83 @@
+"""
+Чтение с реплик для безопасных запросов, запись — в default.
+
+Читать с реплики разрешает ReplicaRoutingMiddleware, поэтому команды,
+воркеры и небезопасные запросы всегда работают с default. Пользователь,
+который что-то записал, ещё REPLICA_STICKY_SECONDS читает с default,
+чтобы увидеть свою запись несмотря на отставание реплик.
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+RECENT_WRITE_KEY = 'replica:recent-write'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES
+            if alias != DEFAULT_DB_ALIAS]
+
+
+@contextmanager
+def read_from(replica):
+    token = _read_from_replica.set(replica)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def sticky_key(request):
+    authorization = request.headers.get('Authorization')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'replica:sticky:{digest}'
+
+
+def mark_written(request):
+    """Запоминает запись: пользователя и кеш каталога ведём на default."""
+    timeout = settings.REPLICA_STICKY_SECONDS
+    values = {RECENT_WRITE_KEY: True}
+    key = sticky_key(request)
+    if key is not None:
+        values[key] = True
+    cache.set_many(values, timeout)
+
+
+def is_sticky(request):
+    key = sticky_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+def recently_written():
+    """Была ли запись за последние REPLICA_STICKY_SECONDS."""
+    return bool(replica_aliases()) and cache.get(RECENT_WRITE_KEY) is not None
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        if self.replicas and _read_from_replica.get():
+            return random.choice(self.replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики репликацией
+        return db == DEFAULT_DB_ALIAS
@@ -125,10 +125,11 @@ class GenreSerializer(serializers.ModelSerializer):
 class TitleSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
+    reviews_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('score_sum', 'updated_at')
 
 
 class TitlePostSerializer(serializers.ModelSerializer):
@@ -145,7 +146,8 @@ class TitlePostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('score_sum', 'reviews_count', 'updated_at')
+        read_only_fields = ('rating',)
 
     def get_rating(self, obj):
         rating = obj.reviews.aggregate(
@@ -153,6 +155,30 @@ class TitlePostSerializer(serializers.ModelSerializer):
         return round(rating, 2) if rating else rating
 
 
+class CategoryBulkSerializer(CategorySerializer):
+    # Уникальность slug проверяется на всю пачку одним запросом
+    slug = serializers.SlugField(max_length=50)
+
+
+class GenreBulkSerializer(GenreSerializer):
+    slug = serializers.SlugField(max_length=50)
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """
+    Произведение из пачки. Категория и жанры ищутся по slug на всю
+    пачку одним запросом, а не SlugRelatedField на каждый элемент.
+    """
+    category = serializers.SlugField(source='category_slug')
+    genre = serializers.ListField(child=serializers.SlugField(),
+                                  source='genre_slugs')
+
+    class Meta:
+        model = Title
+        exclude = ('score_sum', 'reviews_count', 'updated_at')
+        read_only_fields = ('rating',)
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
@@ -174,19 +200,7 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         fields = '__all__'
         model = Review
-
-    def validate(self, data):
-        if self.context['request'].method != 'POST':
-            return data
-
-        title_id = self.context['view'].kwargs.get('title_id')
-        author = self.context['request'].user
-        if Review.objects.filter(
-                author=author, title=title_id).exists():
-            raise serializers.ValidationError(
-                'Нельзя оставить отзыв на одно произведение дважды'
-            )
-        return data
+        read_only_fields = ('comments_count',)
 
     def validate_rate(self, rate):
         return (rate if (settings.MIN_VAL_SCORE <= rate
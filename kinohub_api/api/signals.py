@@ -0,0 +1,263 @@
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from reviews.counters import apply_comment_delta, recount_comments
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking)
+from reviews.ratings import apply_score_change, rank_titles, recompute_titles
+from reviews.search import (REVIEW_FTS_TABLE, TITLE_FTS_TABLE, index_reviews,
+                            index_titles, remove_from_index)
+from reviews.signals import catalog_changed
+from users.models import CustomUser
+from .authentication import user_cache_key
+from .backends import HealthCheckMixin
+from .cache import invalidate_catalog
+from .middleware import install_query_tracking
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(m2m_changed, sender=Title.genre.through)
+@receiver(catalog_changed)
+def invalidate_catalog_cache(sender, **kwargs):
+    # После коммита, чтобы параллельный запрос не закешировал
+    # данные до их сохранения
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    caches[settings.API_CACHE_ALIAS].delete(user_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_titles(sender, instance, raw=False, created=False, **kwargs):
+    # Название и slug категории и жанров входят в выгрузку каталога:
+    # выгрузка с updated_since должна отдать их произведения заново
+    if raw or created:
+        return
+    lookup = 'category' if sender is Category else 'genre'
+    Title.objects.filter(**{lookup: instance}).update(
+        updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    index_titles([instance])
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    remove_from_index(TITLE_FTS_TABLE, [instance.pk])
+
+
+@receiver(post_save, sender=Title)
+def rank_title(sender, instance, **kwargs):
+    # Категория могла смениться, строки пересобираются целиком
+    rank_titles([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def rank_genre_titles(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        rank_titles([instance.pk])
+    elif action != 'post_clear':
+        rank_titles(pk_set)
+    else:
+        TitleRanking.objects.filter(
+            kind=TitleRanking.GENRE, scope_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Genre)
+def unrank_genre(sender, instance, **kwargs):
+    # Связи с произведениями удаляются каскадом без m2m_changed
+    TitleRanking.objects.filter(
+        kind=TitleRanking.GENRE, scope_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, raw, **kwargs):
+    # Счётчики, рейтинг, распределение оценок и таблицы лидеров
+    # меняются при любом сохранении: из API, админки, кода
+    if raw:
+        return
+    current = (instance.title_id, instance.score)
+    counted = (None, None) if created else getattr(
+        instance, 'counted', (None, None))
+    if created:
+        apply_score_change(instance.title_id, new_score=instance.score)
+    elif None not in counted and counted != current:
+        old_title_id, old_score = counted
+        if old_title_id == instance.title_id:
+            apply_score_change(old_title_id, old_score, instance.score)
+        else:
+            apply_score_change(old_title_id, old_score=old_score)
+            apply_score_change(instance.title_id, new_score=instance.score)
+    instance.counted = current
+
+
+class CascadeDelete:
+    """
+    Каскадное удаление произведений, отзывов и пользователей.
+    Дочерние строки удаляемого родителя не меняют счётчики по одной:
+    у удаляемых произведений и отзывов их не нужно менять вовсе,
+    а затронутые удалением автора пересчитываются одним проходом,
+    когда удалён последний родитель.
+    """
+
+    def __init__(self):
+        self.deleting = defaultdict(set)
+        self.pending = 0
+        self.titles = set()
+        self.reviews = set()
+        self.unindexed = []
+
+    def is_deleting(self, model, pk):
+        return pk in self.deleting[model]
+
+    def flush(self):
+        titles = self.titles - self.deleting[Title]
+        reviews = self.reviews - self.deleting[Review]
+        if titles:
+            recompute_titles(list(titles))
+        if reviews:
+            recount_comments(list(reviews))
+        if self.unindexed:
+            remove_from_index(REVIEW_FTS_TABLE, self.unindexed)
+
+
+_cascade = ContextVar('cascade_delete', default=None)
+
+
+def current_cascade():
+    return _cascade.get()
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    cascade = current_cascade()
+    if cascade is None or not (
+            cascade.is_deleting(Title, instance.title_id)
+            or cascade.is_deleting(CustomUser, instance.author_id)):
+        apply_score_change(instance.title_id, old_score=instance.score)
+    elif not cascade.is_deleting(Title, instance.title_id):
+        cascade.titles.add(instance.title_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    counted = None if created else getattr(
+        instance, 'counted_review_id', None)
+    if created:
+        apply_comment_delta(instance.review_id, 1)
+    elif counted is not None and counted != instance.review_id:
+        apply_comment_delta(counted, -1)
+        apply_comment_delta(instance.review_id, 1)
+    instance.counted_review_id = instance.review_id
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    cascade = current_cascade()
+    if cascade is None or not (
+            cascade.is_deleting(Review, instance.review_id)
+            or cascade.is_deleting(CustomUser, instance.author_id)):
+        apply_comment_delta(instance.review_id, -1)
+    elif not cascade.is_deleting(Review, instance.review_id):
+        cascade.reviews.add(instance.review_id)
+
+
+@receiver(post_save, sender=Review)
+def index_review(sender, instance, **kwargs):
+    index_reviews([instance])
+
+
+@receiver(post_delete, sender=Review)
+def unindex_review(sender, instance, **kwargs):
+    cascade = current_cascade()
+    if cascade is None:
+        remove_from_index(REVIEW_FTS_TABLE, [instance.pk])
+    else:
+        cascade.unindexed.append(instance.pk)
+
+
+@receiver(pre_delete, sender=Title)
+@receiver(pre_delete, sender=Review)
+@receiver(pre_delete, sender=CustomUser)
+def start_cascade(sender, instance, **kwargs):
+    # Collector рассылает pre_delete всем собранным объектам до
+    # удаления первой строки, post_delete — после удаления каждой модели
+    cascade = current_cascade()
+    if cascade is None:
+        cascade = CascadeDelete()
+        _cascade.set(cascade)
+    cascade.deleting[sender].add(instance.pk)
+    cascade.pending += 1
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=CustomUser)
+def finish_cascade(sender, **kwargs):
+    cascade = current_cascade()
+    if cascade is None:
+        return
+    # Выполняется после остальных получателей post_delete
+    cascade.pending -= 1
+    if cascade.pending <= 0:
+        _cascade.set(None)
+        cascade.flush()
+
+
+@receiver(request_started)
+def reset_cascade(sender, **kwargs):
+    # Удаление, прерванное ошибкой, не должно влиять на следующие запросы
+    _cascade.set(None)
+
+
+@receiver(connection_created)
+def track_connection_queries(sender, connection, **kwargs):
+    install_query_tracking(connection)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(request_started)
+def check_persistent_connections(sender, **kwargs):
+    """
+    Сохранённые соединения проверяются при первом обращении к базе
+    в запросе (api.backends), здесь они только помечаются.
+    """
+    for connection in connections.all():
+        if isinstance(connection, HealthCheckMixin):
+            connection.request_started()
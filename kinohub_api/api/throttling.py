@@ -0,0 +1,97 @@
+"""
+Ограничение частоты запросов скользящим окном.
+
+Вместо списка отметок времени, как у SimpleRateThrottle, в кеше
+хранятся два счётчика: за текущее и за предыдущее окно. Число запросов
+за последние duration секунд оценивается как счётчик текущего окна плюс
+доля предыдущего. Проверка — один get_many, учёт — add или incr, которые
+атомарны и в памяти процесса, и в Redis. Отклонённый запрос не трогает
+базу и в кеш не пишет.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import throttling
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+        counts = self.cache.get_many((current_key, previous_key))
+        self.elapsed = self.now - window * self.duration
+        self.previous = counts.get(previous_key, 0)
+        self.estimate = (counts.get(current_key, 0) + self.previous
+                         * (1 - self.elapsed / self.duration))
+        if self.estimate >= self.num_requests:
+            return self.throttle_failure()
+
+        # Счётчик живёт два окна: следующее окно читает его как предыдущий
+        if not self.cache.add(current_key, 1, 2 * self.duration):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                self.cache.set(current_key, 1, 2 * self.duration)
+        return True
+
+    def wait(self):
+        """Через сколько секунд оценка опустится ниже лимита."""
+        until_next_window = self.duration - self.elapsed
+        if not self.previous:
+            return until_next_window
+        # Доля предыдущего окна убывает на previous / duration в секунду
+        excess = self.estimate - self.num_requests + 1
+        return min(until_next_window,
+                   excess * self.duration / self.previous)
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle,
+                       SlidingWindowRateThrottle):
+    """Анонимные запросы по IP, scope anon."""
+
+
+class UserRateThrottle(throttling.UserRateThrottle,
+                       SlidingWindowRateThrottle):
+    """Запросы пользователя по id, анонимных — по IP, scope user."""
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle,
+                         SlidingWindowRateThrottle):
+    """Запросы к представлению с throttle_scope по пользователю или IP."""
+
+
+class FieldRateThrottle(SlidingWindowRateThrottle):
+    """
+    Запросы с одним значением поля field в теле, с любых IP:
+    подбор кода к одному username, письма на один e-mail.
+    """
+    field = None
+
+    def get_cache_key(self, request, view):
+        value = request.data.get(self.field) if hasattr(
+            request.data, 'get') else None
+        if not value or not isinstance(value, str):
+            return None
+        ident = hashlib.md5(value.lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class SignUpEmailRateThrottle(FieldRateThrottle):
+    scope = 'signup_email'
+    field = 'email'
+
+
+class TokenUsernameRateThrottle(FieldRateThrottle):
+    scope = 'token_username'
+    field = 'username'
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -31,3 +32,7 @@ urlpatterns = [
     path('v1/', include(v1_router.urls)),
     path('v1/auth/', include(auth_patterns)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Асинхронные GET-эндпоинты перекрывают маршруты роутера
+    urlpatterns.insert(0, path('', include('api.async_urls')))
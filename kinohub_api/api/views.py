@@ -1,32 +1,58 @@
 import secrets
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status, filters, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
-
-from reviews.models import Category, Genre, Review, Title
+from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
+
+from reviews.export import FORMATS as EXPORT_FORMATS, encode, export_lines
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import distribution_stats, get_distribution, rank_titles
+from reviews.signals import catalog_changed
+from reviews.utils import parse_since
+from users.mail import enqueue_mail
 from users.models import CustomUser
-from .filters import TitleFilter
+from .authentication import ClaimsRefreshToken
+from .bulk import BulkCreateMixin
+from .cache import CachedListMixin
+from .fast_serializers import (FastCommentSerializer, FastListMixin,
+                               FastReviewSerializer, FastTitleSerializer)
+from .filters import (FullTextSearchFilter, SearchOrderingFilter,
+                      TitleFilter, TitleOrderingFilter)
+from .pagination import CursorPaginationMixin, ParentCheckMixin
 from .permissions import (IsAdminOrReadOnly, IsAdminOrSuperUser,
                           IsAuthorOrStaffOrReadOnly,
                           IsModeratorOrAuthorOrAuthenticated)
-from .serializers import (CategorySerializer, CommentSerializer,
+from .serializers import (CategoryBulkSerializer, CategorySerializer,
+                          CommentSerializer, GenreBulkSerializer,
                           GenreSerializer, ProfileSerializer,
                           ReviewSerializer, SignUpSerializer,
-                          TitlePostSerializer, TitleSerializer,
-                          TokenReceiveSerializer, UserMeSerializer)
+                          TitleBulkSerializer, TitlePostSerializer,
+                          TitleSerializer, TokenReceiveSerializer,
+                          UserMeSerializer)
+from .throttling import SignUpEmailRateThrottle, TokenUsernameRateThrottle
+
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
 
 
 class SignUpView(generics.CreateAPIView):
+    throttle_classes = (*api_settings.DEFAULT_THROTTLE_CLASSES,
+                        SignUpEmailRateThrottle)
+    throttle_scope = 'signup'
 
     def post(self, request, *args, **kwargs):
         serializer = SignUpSerializer(data=request.data)
@@ -45,19 +71,22 @@ class SignUpView(generics.CreateAPIView):
 
         confirmation_code = secrets.token_hex(32)
         user.confirmation_code = str(confirmation_code)
-        user.save()
-
-        send_mail(
-            subject='Ваш код подтверждения',
-            message=f'Ваш код для регистрации: {confirmation_code}',
-            from_email=settings.DOMAIN_NAME,
-            recipient_list=[email],
-            fail_silently=False,
-        )
+        # Письмо отправит run_mail_worker, запрос не ждёт SMTP
+        with transaction.atomic():
+            user.save()
+            enqueue_mail(
+                subject='Ваш код подтверждения',
+                message=f'Ваш код для регистрации: {confirmation_code}',
+                from_email=settings.DOMAIN_NAME,
+                recipient=email,
+            )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class TokenReceiveView(generics.CreateAPIView):
+    throttle_classes = (*api_settings.DEFAULT_THROTTLE_CLASSES,
+                        TokenUsernameRateThrottle)
+    throttle_scope = 'token'
 
     def post(self, request, *args, **kwargs):
         serializer = TokenReceiveSerializer(data=request.data)
@@ -66,7 +95,7 @@ class TokenReceiveView(generics.CreateAPIView):
             CustomUser,
             username=request.data.get('username')
         )
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
 
         if user.confirmation_code != request.data.get('confirmation_code'):
             return Response(
@@ -105,13 +134,17 @@ class ProfileViewSet(viewsets.ModelViewSet):
             permission_classes=(IsAuthenticated,))
     # Для работы с эндопоинтом /me/
     def me(self, request):
+        user = request.user
+        # Пользователь из токена содержит только поля для проверки прав,
+        # а при изменении профиля нужна актуальная запись
+        if request.method == 'PATCH' or getattr(user, 'is_token_user', False):
+            user = get_object_or_404(CustomUser, pk=user.pk)
         if request.method == 'GET':
-            user_info = get_object_or_404(CustomUser, username=request.user)
-            serializer = self.get_serializer(user_info)
+            serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
         if request.method == 'PATCH':
             serializer = UserMeSerializer(
-                request.user,
+                user,
                 data=request.data,
                 partial=True
             )
@@ -120,9 +153,12 @@ class ProfileViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedListMixin, BulkCreateMixin,
+                      viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    bulk_serializer_class = CategoryBulkSerializer
+    bulk_unique_field = 'slug'
     http_method_names = ['get', 'post', 'delete']
     pagination_class = PageNumberPagination
     filter_backends = (filters.SearchFilter,)
@@ -135,9 +171,11 @@ class CategoryViewSet(viewsets.ModelViewSet):
                         data='Запрос не допустим')
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(CachedListMixin, BulkCreateMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    bulk_serializer_class = GenreBulkSerializer
+    bulk_unique_field = 'slug'
     http_method_names = ['get', 'post', 'delete']
     pagination_class = PageNumberPagination
     filter_backends = (filters.SearchFilter,)
@@ -150,11 +188,17 @@ class GenreViewSet(viewsets.ModelViewSet):
                         data='Запрос не допустим')
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all()
+class TitleViewSet(CachedListMixin, FastListMixin, BulkCreateMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genre')
+    fast_serializer_class = FastTitleSerializer
+    bulk_serializer_class = TitleBulkSerializer
     pagination_class = PageNumberPagination
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, FullTextSearchFilter,
+                       TitleOrderingFilter)
     filterset_class = TitleFilter
+    ordering_fields = ('name', 'year', 'rating', 'reviews_count')
     permission_classes = (IsAdminOrReadOnly,)
 
     def get_serializer_class(self, *args, **kwargs):
@@ -162,41 +206,169 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleSerializer
         return TitlePostSerializer
 
+    @action(detail=False, methods=('GET',))
+    # Потоковая выгрузка всего каталога для партнёров
+    def export(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                f'Формат выгрузки должен быть одним из: '
+                f'{", ".join(EXPORT_FORMATS)}',
+                status=status.HTTP_400_BAD_REQUEST)
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = parse_since(updated_since)
+            except ValueError as error:
+                return Response(str(error),
+                                status=status.HTTP_400_BAD_REQUEST)
+        compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = StreamingHttpResponse(
+            encode(export_lines(output, updated_since or None),
+                   compress=compress),
+            content_type=EXPORT_CONTENT_TYPES[output])
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{output}"')
+        return response
+
+    def validate_bulk(self, items):
+        # Категории и жанры всей пачки ищутся двумя запросами IN,
+        # найденные id дописываются в validated_data
+        categories = dict(Category.objects.filter(slug__in={
+            data['category_slug'] for data in items.values()
+        }).values_list('slug', 'pk'))
+        genres = dict(Genre.objects.filter(slug__in={
+            slug for data in items.values() for slug in data['genre_slugs']
+        }).values_list('slug', 'pk'))
+        message = SlugRelatedField.default_error_messages['does_not_exist']
+        errors = {}
+        for index, data in items.items():
+            error = {}
+            if data['category_slug'] not in categories:
+                error['category'] = [message.format(
+                    slug_name='slug', value=data['category_slug'])]
+            missing = [slug for slug in data['genre_slugs']
+                       if slug not in genres]
+            if missing:
+                error['genre'] = [message.format(slug_name='slug', value=slug)
+                                  for slug in missing]
+            if error:
+                errors[index] = error
+                continue
+            data['genre_slugs'] = list(dict.fromkeys(data['genre_slugs']))
+            data['category_id'] = categories[data['category_slug']]
+            data['genre_ids'] = [genres[slug] for slug in data['genre_slugs']]
+        return errors
+
+    def create_bulk(self, items):
+        titles = [
+            Title(name=data['name'], year=data['year'],
+                  description=data.get('description'),
+                  category_id=data['category_id'])
+            for data in items]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+        else:
+            # SQLite в Django 3.2 не возвращает pk из bulk_create:
+            # произведения сохраняются по одному, в поиск их
+            # добавляет post_save
+            for title in titles:
+                title.save(force_insert=True)
+        Title.genre.through.objects.bulk_create([
+            Title.genre.through(title_id=title.pk, genre_id=genre_id)
+            for title, data in zip(titles, items)
+            for genre_id in data['genre_ids']])
+        # Жанры записаны в обход m2m_changed
+        rank_titles([title.pk for title in titles])
+        catalog_changed.send(sender=Title)
+        for title, data in zip(titles, items):
+            title.category_slug = data['category_slug']
+            title.genre_slugs = data['genre_slugs']
+        return titles
+
+    @action(detail=True, methods=('GET',), url_path='rating-distribution')
+    # Гистограмма оценок и статистика по ней, отзывы не читаются
+    def rating_distribution(self, request, pk=None):
+        distribution = get_distribution(int(pk)) if pk.isdigit() else None
+        if distribution is None:
+            raise NotFound()
+        counts = distribution.counts()
+        return Response({
+            'title': distribution.title_id,
+            **distribution_stats(counts),
+            'distribution': {str(score): count
+                             for score, count in counts.items()},
+        })
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(CursorPaginationMixin, ParentCheckMixin, FastListMixin,
+                    viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    fast_serializer_class = FastReviewSerializer
+    filter_backends = (FullTextSearchFilter, SearchOrderingFilter)
+    ordering_fields = ('pub_date', 'score', 'comments_count')
+    ordering = ('-pub_date', '-id')
     permission_classes = (
         IsModeratorOrAuthorOrAuthenticated | IsAuthorOrStaffOrReadOnly,)
+    parent_model = Title
+    parent_lookups = {'id': 'title_id'}
 
     def get_queryset(self):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')).select_related(
+            'author', 'title')
 
     def perform_create(self, serializer):
-        from django.db.models import Avg
         title = get_object_or_404(
             Title,
             id=self.kwargs.get('title_id'))
-        title.rating = title.reviews.aggregate(Avg('score'))['score__avg']
-        title.save()
-        serializer.save(author=self.request.user, title=title)
+        # Второй отзыв того же автора отсекает ограничение unique_review,
+        # отдельная проверка перед INSERT не нужна. Счётчики
+        # произведения обновляет post_save в той же транзакции
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title=title)
+        except IntegrityError:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Нельзя оставить отзыв на одно произведение дважды']})
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(CursorPaginationMixin, ParentCheckMixin, FastListMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    fast_serializer_class = FastCommentSerializer
     permission_classes = (
         IsModeratorOrAuthorOrAuthenticated | IsAuthorOrStaffOrReadOnly,)
+    parent_model = Review
+    parent_lookups = {'id': 'review_id', 'title_id': 'title_id'}
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'))
-        return review.comments.all()
+        # Условие на title_id проверяет, что отзыв относится к произведению
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'),
+        ).select_related('author')
 
     def perform_create(self, serializer):
         review = get_object_or_404(
             Review,
-            id=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+            id=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id'))
+        # Счётчик комментариев отзыва обновляет post_save
+        with transaction.atomic():
+            serializer.save(author=self.request.user, review=review)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
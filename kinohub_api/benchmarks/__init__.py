@@ -0,0 +1,63 @@
+"""
+Бенчмарки Kinohub.
+
+Запускаются из каталога с manage.py, например:
+python -m benchmarks.search --rows 1000000
+Каждый бенчмарк работает во временной тестовой базе
+и печатает результат в JSON.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kinohub_api.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def temporary_database(name=None):
+    """
+    Создаёт тестовую базу с миграциями и удаляет её после работы.
+    Базу с заданным name сохраняет для следующих запусков.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    keepdb = name is not None
+    if keepdb:
+        connection.settings_dict['TEST']['NAME'] = name
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb)
+
+
+def measure(func, repeat):
+    """Время выполнения func в миллисекундах для каждого из повторов."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(timings):
+    quantiles = statistics.quantiles(timings, n=100) if len(
+        timings) > 1 else timings * 99
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(quantiles[49], 3),
+        'p95_ms': round(quantiles[94], 3),
+        'p99_ms': round(quantiles[98], 3),
+    }
@@ -0,0 +1,131 @@
+"""
+Сравнение горячих GET-эндпоинтов в трёх режимах: WSGI, синхронные
+представления DRF под ASGI и асинхронные представления под ASGI.
+
+python -m benchmarks.asgi --requests 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import setup_django, summarize, temporary_database
+
+
+def seed(titles, reviews_per_title):
+    from reviews.models import Category, Comment, Genre, Review, Title
+    from users.models import CustomUser
+
+    category = Category.objects.create(name='Фильмы', slug='movie')
+    genres = [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+              for i in range(3)]
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'user{i}', email=f'user{i}@example.com')
+        for i in range(reviews_per_title)])
+    users = list(CustomUser.objects.all())
+    for number in range(titles):
+        title = Title.objects.create(
+            name=f'Фильм {number}', year=2000, category=category,
+            description='Описание')
+        title.genre.set(genres)
+    Review.objects.bulk_create([
+        Review(title=title, author=user, text='Отзыв', score=7)
+        for title in Title.objects.all()[:10] for user in users])
+    review = Review.objects.first()
+    Comment.objects.bulk_create([
+        Comment(review=review, author=user, text='Комментарий')
+        for user in users])
+    return title.pk, review.title_id, review.pk
+
+
+def build_urls(title_id, review_title_id, review_id):
+    return {
+        'title_list': '/api/v1/titles/',
+        'title_detail': f'/api/v1/titles/{title_id}/',
+        'review_list': f'/api/v1/titles/{review_title_id}/reviews/',
+        'comment_list': (f'/api/v1/titles/{review_title_id}/reviews/'
+                         f'{review_id}/comments/'),
+    }
+
+
+def report(latencies, elapsed):
+    result = summarize(latencies)
+    result['requests_per_second'] = round(len(latencies) / elapsed, 1)
+    return result
+
+
+def run_wsgi(url, requests, concurrency):
+    from django.test import Client
+
+    def worker(count):
+        client, timings = Client(), []
+        for _ in range(count):
+            started = time.perf_counter()
+            assert client.get(url).status_code == 200
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = executor.map(
+            worker, [requests // concurrency] * concurrency)
+        latencies = [timing for timings in results for timing in timings]
+    return report(latencies, time.perf_counter() - started)
+
+
+def run_asgi(url, requests, concurrency):
+    from django.test import AsyncClient
+
+    async def worker(count):
+        client, timings = AsyncClient(), []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.get(url)
+            assert response.status_code == 200
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    async def main():
+        return await asyncio.gather(*[
+            worker(requests // concurrency) for _ in range(concurrency)])
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    latencies = [timing for timings in results for timing in timings]
+    return report(latencies, time.perf_counter() - started)
+
+
+def run(requests, concurrency):
+    from django.test.utils import override_settings
+
+    urls = build_urls(*seed(titles=50, reviews_per_title=20))
+    modes = (
+        ('wsgi', run_wsgi, 'kinohub_api.urls'),
+        ('asgi_sync', run_asgi, 'kinohub_api.urls'),
+        ('asgi_native', run_asgi, 'benchmarks.urls_async'),
+    )
+    results = {}
+    for name, url in urls.items():
+        results[name] = {}
+        for mode, runner, urlconf in modes:
+            with override_settings(ROOT_URLCONF=urlconf):
+                runner(url, concurrency, concurrency)  # прогрев
+                results[name][mode] = runner(url, requests, concurrency)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    setup_django()
+    with temporary_database():
+        result = run(args.requests, args.concurrency)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
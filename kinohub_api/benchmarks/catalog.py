@@ -0,0 +1,235 @@
+"""
+Синтетический каталог для бенчмарков: произведения, отзывы
+и комментарии с перекосом популярности, как в реальном трафике.
+Строки вставляются пачками в обход ORM вместе с уже посчитанными
+счётчиками и рейтингом, поисковый индекс перестраивается после вставки.
+
+python -m benchmarks.catalog --scale large --db /tmp/kinohub-large.sqlite3
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import random
+import time
+
+from . import setup_django, temporary_database
+from .search import TextGenerator, make_vocabulary
+
+# Произведения, отзывы, комментарии
+SCALES = {
+    'small': (1_000, 20_000, 40_000),
+    'medium': (10_000, 500_000, 1_000_000),
+    'large': (100_000, 5_000_000, 10_000_000),
+}
+CATEGORIES = 20
+GENRES = 40
+BATCH_SIZE = 10_000
+# Тексты берутся из заранее сгенерированного набора: генерация
+# каждого текста заняла бы большую часть времени
+TEXT_POOL_SIZE = 5_000
+
+
+def skewed_counts(total, buckets):
+    """
+    Распределяет total по buckets с весом 1/sqrt(ранга):
+    первые элементы самые популярные, у каждого хотя бы одна запись.
+    """
+    weights = [1 / math.sqrt(rank) for rank in range(1, buckets + 1)]
+    scale = total / sum(weights)
+    return [max(1, round(weight * scale)) for weight in weights]
+
+
+def insert(model, fields, rows):
+    from django.db import connection
+
+    from reviews.utils import chunked
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(field).column)
+                        for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = (f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+           f'VALUES ({placeholders})')
+    with connection.cursor() as cursor:
+        for batch in chunked(rows, BATCH_SIZE):
+            cursor.executemany(sql, batch)
+
+
+def consecutive_pks(model, count):
+    """Первичные ключи только что вставленных в пустую таблицу строк."""
+    pks = model.objects.order_by('pk').values_list('pk', flat=True)
+    first, last = pks.first(), pks.last()
+    assert last - first + 1 == count, f'{model.__name__}: пропуски в pk'
+    return range(first, last + 1)
+
+
+def timestamps(count, now):
+    """Даты публикации за последние три года по возрастанию."""
+    from django.db import connection
+
+    step = datetime.timedelta(days=3 * 365) / count
+    start = now - step * count
+    adapt = connection.ops.adapt_datetimefield_value
+    return (adapt(start + step * index) for index in range(count))
+
+
+def rankings(title_genres, mean):
+    """Строки таблиц лидеров для только что вставленных произведений."""
+    from reviews.models import Title, TitleRanking
+    from reviews.ratings import bayesian_rating
+
+    titles = list(Title.objects.values_list(
+        'pk', 'category_id', 'score_sum', 'reviews_count'))
+    weighted = {}
+    for title_id, category_id, score_sum, count in titles:
+        weighted[title_id] = bayesian_rating(score_sum, count, mean)
+        yield TitleRanking.ALL, 0, title_id, weighted[title_id]
+        yield (TitleRanking.CATEGORY, category_id, title_id,
+               weighted[title_id])
+    for title_id, genre_id in title_genres:
+        yield TitleRanking.GENRE, genre_id, title_id, weighted[title_id]
+
+
+def generate(titles, reviews, comments, seed=0):
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from reviews.models import (SCORES, Category, Comment, Genre,
+                                RatingDistribution, Review, Title,
+                                TitleRanking)
+    from reviews.search import rebuild_index
+    from users.models import CustomUser
+
+    rng = random.Random(seed)
+    generator = TextGenerator(make_vocabulary(20_000, rng), rng)
+    pools = {length: [generator(length) for _ in range(TEXT_POOL_SIZE)]
+             for length in (3, 12, 30, 40)}
+
+    def text(length):
+        return rng.choice(pools[length])
+
+    now = timezone.now()
+    review_counts = skewed_counts(reviews, titles)
+    review_total = sum(review_counts)
+    scores = bytes(rng.randint(1, 10) for _ in range(review_total))
+    # Популярные отзывы раскиданы по всем произведениям,
+    # а не собраны у самого популярного
+    comment_counts = skewed_counts(comments, review_total)
+    rng.shuffle(comment_counts)
+    # Отзыв от автора на произведение может быть только один
+    users = max(review_counts)
+
+    with transaction.atomic():
+        Category.objects.bulk_create([
+            Category(name=f'Категория {index}', slug=f'category-{index}')
+            for index in range(CATEGORIES)])
+        Genre.objects.bulk_create([
+            Genre(name=f'Жанр {index}', slug=f'genre-{index}')
+            for index in range(GENRES)])
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'user{index}',
+                       email=f'user{index}@example.com')
+            for index in range(users)], batch_size=BATCH_SIZE)
+        category_ids = list(Category.objects.values_list('pk', flat=True))
+        genre_ids = list(Genre.objects.values_list('pk', flat=True))
+        user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+        adapted_now = connection.ops.adapt_datetimefield_value(now)
+
+        offsets = list(itertools.accumulate(review_counts, initial=0))
+        insert(Title, ('category', 'name', 'year', 'description', 'rating',
+                       'score_sum', 'reviews_count', 'updated_at'), (
+            (rng.choice(category_ids), text(3), rng.randint(1920, 2023),
+             text(40), score_sum / count, score_sum, count, adapted_now)
+            for count, score_sum in (
+                (count, sum(scores[start:start + count]))
+                for count, start in zip(review_counts, offsets))))
+        title_ids = consecutive_pks(Title, titles)
+        insert(RatingDistribution, ('title', *map(
+            RatingDistribution.field_name, SCORES)), (
+            (title_id, *map(scores[start:start + count].count, SCORES))
+            for title_id, count, start in zip(
+                title_ids, review_counts, offsets)))
+        title_genres = [(title_id, genre_id)
+                        for title_id in title_ids
+                        for genre_id in rng.sample(genre_ids,
+                                                   rng.randint(1, 3))]
+        insert(Title.genre.through, ('title', 'genre'), title_genres)
+        insert(TitleRanking,
+               ('kind', 'scope_id', 'title', 'weighted_rating'),
+               rankings(title_genres, sum(scores) / review_total))
+
+        insert(Review, ('title', 'author', 'text', 'score', 'pub_date',
+                        'comments_count'), (
+            (title_id, author_id, text(30), score, pub_date, comment_count)
+            for (title_id, author_id), score, pub_date, comment_count in zip(
+                ((title_id, author_id)
+                 for title_id, count in zip(title_ids, review_counts)
+                 for author_id in rng.sample(user_ids, count)),
+                scores, timestamps(review_total, now), comment_counts)))
+        review_ids = consecutive_pks(Review, review_total)
+        insert(Comment, ('review', 'author', 'text', 'pub_date'), (
+            (review_id, rng.choice(user_ids), text(12), pub_date)
+            for review_id, pub_date in zip(
+                itertools.chain.from_iterable(
+                    itertools.repeat(review_id, count)
+                    for review_id, count in zip(review_ids, comment_counts)),
+                timestamps(sum(comment_counts), now))))
+    rebuild_index()
+    return counts()
+
+
+def counts():
+    from reviews.models import Comment, Review, Title
+    from users.models import CustomUser
+
+    return {
+        'titles': Title.objects.count(),
+        'reviews': Review.objects.count(),
+        'comments': Comment.objects.count(),
+        'users': CustomUser.objects.count(),
+    }
+
+
+def ensure_catalog(titles, reviews, comments, seed=0):
+    """Генерирует каталог, если база пуста, и возвращает размеры."""
+    from reviews.models import Title
+
+    if Title.objects.exists():
+        return counts()
+    return generate(titles, reviews, comments, seed)
+
+
+def add_scale_arguments(parser):
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--titles', type=int)
+    parser.add_argument('--reviews', type=int)
+    parser.add_argument('--comments', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--db', help=('Файл (имя) базы, которая сохраняется между '
+                      'запусками: каталог генерируется один раз.'))
+
+
+def scale_from_args(args):
+    titles, reviews, comments = SCALES[args.scale]
+    return (args.titles or titles, args.reviews or reviews,
+            args.comments or comments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django()
+    with temporary_database(args.db):
+        started = time.perf_counter()
+        result = ensure_catalog(*scale_from_args(args), seed=args.seed)
+        result['seconds'] = round(time.perf_counter() - started, 1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Сравнение двух результатов benchmarks.endpoints, например до и после
+изменения. Регрессией считается рост p50 или p99 либо падение
+пропускной способности больше порога, а также рост числа запросов
+к базе. При регрессиях код выхода 1.
+
+python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# Условия прогона, без совпадения которых сравнение неточно
+CONDITIONS = ('transport', 'concurrency', 'catalog', 'database')
+# Метрика и знак: 1, если рост значения — это ухудшение
+METRICS = (
+    ('p50_ms', 1),
+    ('p99_ms', 1),
+    ('requests_per_second', -1),
+)
+
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(before, after, threshold):
+    rows, regressions = [], []
+    for name, new in after['endpoints'].items():
+        old = before['endpoints'].get(name)
+        if old is None:
+            continue
+        cells = []
+        for metric, sign in METRICS:
+            delta = change(old[metric], new[metric])
+            cells.append(f'{metric} {old[metric]} → {new[metric]} '
+                         f'({delta:+.1f}%)')
+            if delta * sign > threshold:
+                regressions.append(f'{name}: {metric} {delta:+.1f}%')
+        if old['queries'] is not None and new['queries'] is not None:
+            cells.append(f'queries {old["queries"]} → {new["queries"]}')
+            if new['queries'] > old['queries']:
+                regressions.append(
+                    f'{name}: queries {old["queries"]} → {new["queries"]}')
+        rows.append(f'{name:24} ' + ', '.join(cells))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='допустимое ухудшение в процентах')
+    args = parser.parse_args()
+
+    results = []
+    for path in (args.before, args.after):
+        with open(path, encoding='utf-8') as file:
+            results.append(json.load(file))
+    before, after = results
+    print(f'{before["meta"]["revision"]} → {after["meta"]["revision"]}')
+    for key in CONDITIONS:
+        if before['meta'][key] != after['meta'][key]:
+            print(f'Внимание: различается {key}: '
+                  f'{before["meta"][key]} → {after["meta"][key]}')
+    rows, regressions = compare(before, after, args.threshold)
+    print('\n'.join(rows))
+    if regressions:
+        print('\nРегрессии:\n' + '\n'.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
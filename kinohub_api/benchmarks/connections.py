@@ -0,0 +1,89 @@
+"""
+Задержка запросов с новым соединением с базой на каждый запрос
+(CONN_MAX_AGE=0) и с сохранёнными соединениями.
+
+Запросы идут в WSGIHandler из долгоживущих потоков, как у воркеров
+gunicorn: тестовый клиент Django и runserver соединения между
+запросами не переиспользуют. База — файл SQLite в режиме WAL.
+
+python -m benchmarks.connections --threads 8 --requests 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import setup_django, summarize, temporary_database
+
+
+def seed():
+    from reviews.models import Category, Title
+
+    category = Category.objects.create(name='Фильмы', slug='movie')
+    return Title.objects.create(name='Фильм', year=2000, category=category)
+
+
+def run_mode(url, conn_max_age, threads, requests):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test import RequestFactory
+
+    # Настройки соединения общие для потоков, срок жизни
+    # берётся в момент открытия соединения
+    connections.databases['default']['CONN_MAX_AGE'] = conn_max_age
+    handler = WSGIHandler()
+    environ = RequestFactory()._base_environ(PATH_INFO=url,
+                                            REQUEST_METHOD='GET')
+
+    def start_response(status, headers):
+        assert status.startswith('200'), status
+
+    def worker(count):
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = handler(dict(environ), start_response)
+            b''.join(response)
+            # Как у WSGI-сервера: close() шлёт request_finished
+            response.close()
+            timings.append((time.perf_counter() - started) * 1000)
+        connections.close_all()
+        return timings
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = executor.map(worker, [requests // threads] * threads)
+        timings = [timing for part in results for timing in part]
+    result = summarize(timings)
+    result['requests_per_second'] = round(
+        len(timings) / (time.perf_counter() - started), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'connections.sqlite3')
+    with temporary_database(path):
+        url = f'/api/v1/titles/{seed().pk}/'
+        result = {}
+        for mode, conn_max_age in (('per_request', 0), ('persistent', 60)):
+            run_mode(url, conn_max_age, args.threads, args.threads)
+            result[mode] = run_mode(url, conn_max_age, args.threads,
+                                    args.requests)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.rmdir(directory)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
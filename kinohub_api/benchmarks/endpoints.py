@@ -0,0 +1,331 @@
+"""
+Нагрузочный прогон всех эндпоинтов API на синтетическом каталоге.
+
+Эндпоинты вызываются через тестовый клиент Django или через настоящий
+HTTP-сервер, поднятый в этом же процессе. Для каждого считаются
+пропускная способность, p50/p95/p99 и число запросов к базе.
+Результат в JSON сравнивается между коммитами benchmarks.compare.
+
+python -m benchmarks.endpoints --scale medium --db /tmp/kinohub.sqlite3 \
+    --transport server --output before.json
+"""
+import argparse
+import collections
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from . import setup_django, summarize, temporary_database
+from .catalog import add_scale_arguments, ensure_catalog, scale_from_args
+
+# Эндпоинт; url и body могут зависеть от номера запроса.
+# Запросы на запись идут в один поток, тяжёлые повторяются реже
+Endpoint = collections.namedtuple(
+    'Endpoint', 'name method url body token write divisor',
+    defaults=(None, None, False, 1))
+
+
+class ClientTransport:
+    """Тестовый клиент Django, свой для каждого потока."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, url, body=None, token=None):
+        from django.test import Client
+
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        response = self.local.client.generic(
+            method, url, json.dumps(body) if body is not None else '',
+            content_type='application/json', **extra)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerTransport:
+    """Многопоточный WSGI-сервер Django на свободном порту."""
+
+    def __init__(self):
+        from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                                  WSGIRequestHandler)
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(get_wsgi_application())
+        self.base_url = 'http://127.0.0.1:%d' % self.server.server_port
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def request(self, method, url, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            self.base_url + urllib.parse.quote(url, safe='/?=&'),
+            data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def prepare_fixtures():
+    """Пользователи для запросов с токеном и самые нагруженные объекты."""
+    from django.conf import settings
+
+    from api.authentication import ClaimsRefreshToken
+    from reviews.models import Review, Title
+    from reviews.search import search_title_ids
+    from users.models import CustomUser
+
+    run = int(time.time())
+    admin, _ = CustomUser.objects.get_or_create(
+        username='benchmark-admin',
+        defaults={'email': 'benchmark-admin@example.com', 'role': 'admin',
+                  'confirmation_code': 'benchmark'})
+    # Свой автор на каждый прогон: отзыв на произведение у автора один
+    author = CustomUser.objects.create(
+        username=f'benchmark-{run}', email=f'benchmark-{run}@example.com')
+    hot_title = Title.objects.order_by('-reviews_count').first()
+    hot_review = Review.objects.order_by('-comments_count').first()
+    search = hot_title.name.split()[0]
+    # Страницы поиска берутся только существующие, иначе часть
+    # запросов вернёт 404
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    search_pages = math.ceil(len(search_title_ids(search)) / page_size)
+    return {
+        'run': run,
+        'admin': admin,
+        'admin_token': str(ClaimsRefreshToken.for_user(admin).access_token),
+        'author_token': str(
+            ClaimsRefreshToken.for_user(author).access_token),
+        'title': hot_title,
+        'review': hot_review,
+        'title_ids': list(Title.objects.order_by(
+            '-reviews_count').values_list('pk', flat=True)[:10_000]),
+        'category': hot_title.category.slug,
+        'genre': hot_title.genre.first().slug,
+        'search': search,
+        'search_pages': min(3, max(1, search_pages)),
+    }
+
+
+def endpoints(fixtures):
+    title = fixtures['title']
+    review = fixtures['review']
+    admin_token = fixtures['admin_token']
+    run = fixtures['run']
+    titles = '/api/v1/titles'
+    reviews = f'{titles}/{title.pk}/reviews'
+    hot_review = f'{titles}/{review.title_id}/reviews/{review.pk}'
+    comments = f'{hot_review}/comments'
+    deep_page = max(1, title.reviews_count // 5 // 2)
+    title_ids = fixtures['title_ids']
+    search_pages = fixtures['search_pages']
+    return (
+        Endpoint('category_list', 'GET', '/api/v1/categories/'),
+        Endpoint('genre_list', 'GET', '/api/v1/genres/'),
+        Endpoint('title_list', 'GET', f'{titles}/'),
+        Endpoint('title_list_filtered', 'GET',
+                 f'{titles}/?category={fixtures["category"]}'
+                 f'&genre={fixtures["genre"]}'),
+        Endpoint('title_list_ordered', 'GET', f'{titles}/?ordering=-rating'),
+        Endpoint('title_search', 'GET',
+                 lambda n: f'{titles}/?search={fixtures["search"]}'
+                           f'&page={n % search_pages + 1}'),
+        Endpoint('title_detail', 'GET', f'{titles}/{title.pk}/'),
+        Endpoint('title_export', 'GET', f'{titles}/export/', divisor=20),
+        Endpoint('title_create', 'POST', f'{titles}/',
+                 body=lambda n: {
+                     'name': f'Бенчмарк {run}-{n}', 'year': 2000,
+                     'category': fixtures['category'],
+                     'genre': [fixtures['genre']]},
+                 token=admin_token, write=True),
+        Endpoint('title_update', 'PATCH', f'{titles}/{title.pk}/',
+                 body={'year': title.year}, token=admin_token, write=True),
+        Endpoint('review_list', 'GET', f'{reviews}/'),
+        Endpoint('review_list_deep', 'GET', f'{reviews}/?page={deep_page}'),
+        Endpoint('review_list_cursor', 'GET',
+                 f'{reviews}/?pagination=cursor'),
+        Endpoint('review_detail', 'GET', f'{hot_review}/'),
+        Endpoint('review_create', 'POST',
+                 lambda n: f'{titles}/{title_ids[n % len(title_ids)]}'
+                           f'/reviews/',
+                 body={'text': 'Отзыв', 'score': 7},
+                 token=fixtures['author_token'], write=True),
+        Endpoint('comment_list', 'GET', f'{comments}/'),
+        Endpoint('comment_create', 'POST', f'{comments}/',
+                 body={'text': 'Комментарий'},
+                 token=fixtures['author_token'], write=True),
+        Endpoint('user_list', 'GET', '/api/v1/users/', token=admin_token),
+        Endpoint('user_detail', 'GET',
+                 f'/api/v1/users/{fixtures["admin"].username}/',
+                 token=admin_token),
+        Endpoint('user_me', 'GET', '/api/v1/users/me/', token=admin_token),
+        Endpoint('signup', 'POST', '/api/v1/auth/signup/',
+                 body=lambda n: {'username': f'signup-{run}-{n}',
+                                 'email': f'signup-{run}-{n}@example.com'},
+                 write=True),
+        Endpoint('token', 'POST', '/api/v1/auth/token/',
+                 body={'username': 'benchmark-admin',
+                       'confirmation_code': 'benchmark'},
+                 write=True),
+    )
+
+
+def resolve(value, number):
+    return value(number) if callable(value) else value
+
+
+def count_queries(probe, endpoint, number):
+    """Запросы к базе считаются на одном запросе через тестовый клиент."""
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+
+    with ExitStack() as stack:
+        contexts = [stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()]
+        status = call(probe, endpoint, number)
+    return status, sum(len(context) for context in contexts)
+
+
+def call(transport, endpoint, number):
+    return transport.request(
+        endpoint.method, resolve(endpoint.url, number),
+        resolve(endpoint.body, number), endpoint.token)
+
+
+def run_endpoint(transport, probe, endpoint, requests, concurrency):
+    counter = itertools.count(1)
+    status, queries = count_queries(probe, endpoint, 0)
+    requests = max(1, requests // endpoint.divisor)
+    workers = 1 if endpoint.write else concurrency
+
+    def worker(count):
+        timings, statuses = [], collections.Counter()
+        for _ in range(count):
+            started = time.perf_counter()
+            statuses[call(transport, endpoint, next(counter))] += 1
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, statuses
+
+    shares = [requests // workers + (index < requests % workers)
+              for index in range(workers)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(worker, shares))
+    elapsed = time.perf_counter() - started
+    timings = [timing for part, _ in results for timing in part]
+    statuses = sum((part for _, part in results), collections.Counter())
+    result = summarize(timings)
+    result.update({
+        'method': endpoint.method,
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'queries': queries,
+        'status': status,
+        'statuses': {str(code): count for code, count in statuses.items()},
+    })
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    import django
+    from django.db import connection
+
+    catalog = ensure_catalog(*scale_from_args(args), seed=args.seed)
+    fixtures = prepare_fixtures()
+    transport = (ServerTransport() if args.transport == 'server'
+                 else ClientTransport())
+    probe = ClientTransport()
+    selected = [endpoint for endpoint in endpoints(fixtures)
+                if not args.only or endpoint.name in args.only]
+    results = {}
+    try:
+        for endpoint in selected:
+            results[endpoint.name] = run_endpoint(
+                transport, probe, endpoint, args.requests, args.concurrency)
+    finally:
+        transport.close()
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'transport': args.transport,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'catalog': catalog,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'endpoints': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_scale_arguments(parser)
+    parser.add_argument('--transport', choices=('client', 'server'),
+                        default='client')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='запросов на эндпоинт')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='потоков для запросов на чтение')
+    parser.add_argument('--only', nargs='+', metavar='ENDPOINT',
+                        help='прогнать только эти эндпоинты')
+    parser.add_argument('--output', help='файл для результата в JSON')
+    args = parser.parse_args()
+
+    # Лимиты частоты отклоняли бы повторные регистрации и токены
+    for scope in ('signup', 'signup_email', 'token', 'token_username'):
+        os.environ.setdefault(f'THROTTLE_{scope.upper()}_RATE', '')
+    setup_django()
+    with temporary_database(args.db):
+        result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Сравнение полнотекстового поиска с LIKE '%...%' на больших объёмах.
+
+python -m benchmarks.search --rows 1000000 --queries 20
+"""
+import argparse
+import itertools
+import json
+import random
+
+from . import measure, setup_django, summarize, temporary_database
+
+SYLLABLES = ('ка', 'ло', 'ми', 'ра', 'то', 'не', 'ви', 'су', 'дор', 'лин',
+             'ma', 'ro', 'ti', 'ne', 'sa', 'vel', 'dan', 'kor')
+
+
+def make_vocabulary(size, rng):
+    words = [''.join(syllables)
+             for length in (2, 3, 4)
+             for syllables in itertools.product(SYLLABLES, repeat=length)]
+    return rng.sample(words, size)
+
+
+class TextGenerator:
+    """Текст с распределением частот слов по закону Ципфа."""
+
+    def __init__(self, vocabulary, rng):
+        self.vocabulary = vocabulary
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)))
+        self.rng = rng
+
+    def __call__(self, length):
+        return ' '.join(self.rng.choices(
+            self.vocabulary, cum_weights=self.cum_weights, k=length))
+
+
+def seed_titles(rows, batch_size, random_text):
+    from reviews.models import Category, Title
+
+    category = Category.objects.create(name='Фильмы', slug='movie')
+    for start in range(0, rows, batch_size):
+        Title.objects.bulk_create([
+            Title(name=random_text(3),
+                  description=random_text(20),
+                  year=1900 + start % 120,
+                  category=category)
+            for _ in range(min(batch_size, rows - start))
+        ])
+
+
+def run(rows, queries, batch_size, seed):
+    from django.db.models import Q
+    from reviews.models import Title
+    from reviews.search import rebuild_index, search_title_ids
+
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(50_000, rng)
+    seed_titles(rows, batch_size, TextGenerator(vocabulary, rng))
+    rebuild_index()
+    # Самые частые слова отбросим: по ним ищут редко
+    terms = rng.sample(vocabulary[100:10_000], queries)
+
+    def like_scan():
+        for term in terms:
+            list(Title.objects.filter(
+                Q(name__icontains=term) | Q(description__icontains=term)
+            ).values_list('pk', flat=True)[:1000])
+
+    def full_text():
+        for term in terms:
+            search_title_ids(term, limit=1000)
+
+    like = summarize([timing / queries for timing in measure(like_scan, 3)])
+    fts = summarize([timing / queries for timing in measure(full_text, 3)])
+    return {
+        'rows': rows,
+        'queries': queries,
+        'like': like,
+        'full_text': fts,
+        'speedup': round(like['mean_ms'] / fts['mean_ms'], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    with temporary_database():
+        result = run(args.rows, args.queries, args.batch_size, args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
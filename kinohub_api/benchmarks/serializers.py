@@ -0,0 +1,83 @@
+"""
+Сравнение быстрых сериализаторов списков с обычными сериализаторами DRF:
+время сериализации и рендеринга загруженной страницы и построения
+страницы вместе с запросами. Совпадение ответов байт в байт
+проверяет tests/test_serializers.py.
+
+python -m benchmarks.serializers --page-size 100
+"""
+import argparse
+import json
+
+from . import measure, setup_django, summarize, temporary_database
+from .catalog import generate
+
+
+def compare_speed(page_size, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from api.fast_serializers import (FastCommentSerializer,
+                                      FastReviewSerializer,
+                                      FastTitleSerializer)
+    from api.renderers import FastJSONRenderer
+    from api.serializers import (CommentSerializer, ReviewSerializer,
+                                 TitleSerializer)
+    from api.views import TitleViewSet
+    from reviews.models import Comment, Review
+
+    cases = (
+        ('title', TitleViewSet.queryset.order_by('-id'),
+         TitleSerializer, FastTitleSerializer),
+        ('review', Review.objects.select_related('author', 'title'),
+         ReviewSerializer, FastReviewSerializer),
+        ('comment', Comment.objects.select_related('author'),
+         CommentSerializer, FastCommentSerializer),
+    )
+    results = {}
+    for name, queryset, serializer_class, fast_class in cases:
+        # serialize: страница уже загружена, но жанры быстрый
+        # сериализатор читает сам; page: загрузка страницы целиком
+        objects = list(queryset[:page_size])
+        rows = list(fast_class.values(queryset)[:page_size])
+        variants = {
+            'serialize': (
+                lambda: JSONRenderer().render(
+                    serializer_class(objects, many=True).data),
+                lambda: FastJSONRenderer().render(fast_class(rows).data)),
+            'page': (
+                lambda: JSONRenderer().render(serializer_class(
+                    list(queryset[:page_size]), many=True).data),
+                lambda: FastJSONRenderer().render(fast_class(
+                    list(fast_class.values(queryset)[:page_size])).data)),
+        }
+        results[name] = {}
+        for variant, (drf, fast) in variants.items():
+            drf_timings = summarize(measure(drf, repeat))
+            fast_timings = summarize(measure(fast, repeat))
+            results[name][variant] = {
+                'drf': drf_timings,
+                'fast': fast_timings,
+                'speedup': round(drf_timings['p50_ms']
+                                 / fast_timings['p50_ms'], 2),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with temporary_database():
+        generate(titles=300, reviews=6_000, comments=6_000)
+        result = {
+            'page_size': args.page_size,
+            'speed': compare_speed(args.page_size, args.repeat),
+        }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
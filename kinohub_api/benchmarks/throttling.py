@@ -0,0 +1,154 @@
+"""
+Проверка и скорость ограничения частоты запросов.
+
+Проверяется, что регистрация и получение токена отклоняются с 429
+и Retry-After после лимитов по IP, по e-mail и по username, а
+отклонённый запрос не делает ни одного запроса к базе и не ставит
+письмо в очередь. Затем время allow_request скользящего окна
+сравнивается с SimpleRateThrottle DRF при заданной истории запросов.
+При нарушении код выхода 1.
+
+python -m benchmarks.throttling --history 1000
+"""
+import argparse
+import json
+import logging
+import sys
+
+from . import measure, setup_django, summarize, temporary_database
+
+
+def post(client, url, body, address):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, body, content_type='application/json',
+                               REMOTE_ADDR=address)
+    return response, len(context)
+
+
+def flood(client, url, bodies, addresses):
+    """Статусы ответов и запросы к базе у отклонённых."""
+    statuses, rejected_queries, retry_after = [], 0, True
+    for body, address in zip(bodies, addresses):
+        response, queries = post(client, url, body, address)
+        statuses.append(response.status_code)
+        if response.status_code == 429:
+            rejected_queries += queries
+            retry_after &= int(response['Retry-After']) > 0
+    rejected = statuses.count(429)
+    return {'allowed': len(statuses) - rejected,
+            'rejected': rejected,
+            'rejected_queries': rejected_queries,
+            'retry_after': retry_after}
+
+
+def check_limits():
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client
+
+    from users.models import CustomUser, OutgoingMail
+
+    rates = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    limit = {scope: int(rate.split('/')[0])
+             for scope, rate in rates.items() if rate}
+    client = Client()
+    signup = '/api/v1/auth/signup/'
+    token = '/api/v1/auth/token/'
+    results = {}
+
+    cache.clear()
+    results['signup_same_email'] = flood(
+        client, signup,
+        ({'username': 'victim', 'email': 'victim@example.com'}
+         for _ in range(10)),
+        (f'10.0.0.{number}' for number in range(10)))
+    results['signup_same_email']['mails'] = OutgoingMail.objects.filter(
+        recipient='victim@example.com').count()
+
+    cache.clear()
+    results['signup_same_ip'] = flood(
+        client, signup,
+        ({'username': f'bot-{number}', 'email': f'bot-{number}@example.com'}
+         for number in range(limit['signup'] + 5)),
+        ['10.0.1.1'] * (limit['signup'] + 5))
+
+    cache.clear()
+    CustomUser.objects.create(username='target', email='target@example.com',
+                              confirmation_code='secret')
+    results['token_same_username'] = flood(
+        client, token,
+        ({'username': 'target', 'confirmation_code': f'guess-{number}'}
+         for number in range(limit['token_username'] + 5)),
+        (f'10.0.2.{number}' for number in range(limit['token_username'] + 5)))
+
+    cache.clear()
+    results['token_same_ip'] = flood(
+        client, token,
+        ({'username': f'user-{number}', 'confirmation_code': 'guess'}
+         for number in range(limit['token'] + 5)),
+        ['10.0.3.1'] * (limit['token'] + 5))
+
+    ok = (
+        results['signup_same_email']['allowed'] == limit['signup_email']
+        and results['signup_same_email']['mails'] == limit['signup_email']
+        and results['signup_same_ip']['allowed'] == limit['signup']
+        and results['token_same_username']['allowed']
+        == limit['token_username']
+        and results['token_same_ip']['allowed'] == limit['token']
+        and all(result['rejected'] and result['retry_after']
+                and not result['rejected_queries']
+                for result in results.values()))
+    return ok, results
+
+
+def compare_speed(history, repeat):
+    from django.core.cache import cache
+    from rest_framework import throttling
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.throttling import AnonRateThrottle
+
+    class DRFAnonRateThrottle(throttling.AnonRateThrottle):
+        rate = '1000000/hour'
+
+    class SlidingAnonRateThrottle(AnonRateThrottle):
+        rate = '1000000/hour'
+
+    request = Request(APIRequestFactory().get('/'))
+    results = {}
+    for name, throttle_class in (('drf', DRFAnonRateThrottle),
+                                 ('sliding', SlidingAnonRateThrottle)):
+        cache.clear()
+        for _ in range(history):
+            throttle_class().allow_request(request, None)
+        results[name] = summarize(measure(
+            lambda: throttle_class().allow_request(request, None), repeat))
+    results['speedup'] = round(results['drf']['p50_ms']
+                               / results['sliding']['p50_ms'], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, default=1000,
+                        help='запросов в окне до замера')
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    # Ответы 4xx здесь ожидаемы
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    with temporary_database():
+        ok, limits = check_limits()
+        result = {'limits': limits,
+                  'speed': compare_speed(args.history, args.repeat)}
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+from django.urls import include, path
+
+# Корневой urlconf с асинхронными GET-эндпоинтами поверх роутера DRF
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    path('api/', include('api.urls')),
+]
@@ -0,0 +1,10 @@
+"""
+Маршруты админки. Модуль импортируется при первом обращении
+к /admin/ или к reverse(), тогда же регистрируются модели админки.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+app_name = 'admin'
+urlpatterns = admin.site.get_urls()
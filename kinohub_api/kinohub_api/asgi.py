@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kinohub_api.settings')
 
 application = get_asgi_application()
+
+if settings.STARTUP_WARMUP:
+    from kinohub_api.warmup import warm_up
+
+    warm_up()
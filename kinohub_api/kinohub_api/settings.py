@@ -15,7 +15,9 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Модели админки регистрируются при первом обращении к ней,
+    # см. kinohub_api/admin_urls.py
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -30,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,12 +67,40 @@ WSGI_APPLICATION = 'kinohub_api.wsgi.application'
 
 # Database
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# По умолчанию SQLite, PostgreSQL включается через DB_ENGINE=postgresql.
+# Соединения живут DB_CONN_MAX_AGE секунд и переиспользуются запросами,
+# бэкенды из api.backends проверяют их при первом обращении в запросе
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'api.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'kinohub'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # За pgbouncer в режиме transaction серверные курсоры
+            # не переживают транзакцию
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_PGBOUNCER') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'api.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # Секунды ожидания блокировки записи
+            'OPTIONS': {'timeout': 20},
+        }
     }
-}
 
 # Password validation
 
@@ -114,16 +146,110 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.AnonRateThrottle',
+        'api.throttling.UserRateThrottle',
+        'api.throttling.ScopedRateThrottle',
+    ),
+    # Число доверенных прокси перед приложением: IP клиента для
+    # ограничений берётся из X-Forwarded-For с учётом только их записей.
+    # 0 — заголовок не читается, используется REMOTE_ADDR
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
+    # Пустое значение в переменной окружения отключает ограничение
+    'DEFAULT_THROTTLE_RATES': {
+        scope: os.getenv(f'THROTTLE_{scope.upper()}_RATE', rate) or None
+        for scope, rate in (
+            ('anon', None),
+            ('user', None),
+            ('signup', '20/hour'),
+            ('signup_email', '3/hour'),
+            ('token', '30/min'),
+            ('token_username', '10/min'),
+        )
+    },
+}
+# Асинхронные версии горячих GET-эндпоинтов, имеет смысл под ASGI
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '') == '1'
+# Максимальный размер страницы, который может запросить клиент
+MAX_PAGE_SIZE = 100
+# Кеш. По умолчанию в памяти процесса, при заданном REDIS_URL
+# общий для всех воркеров (нужен пакет django-redis)
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Кеширование ответов каталога (категории, жанры, произведения).
+# Версию каталога в кеше в памяти процесса сбрасывает только воркер,
+# который записал, поэтому без REDIS_URL ответы живут недолго:
+# остальные воркеры отдают устаревший каталог не дольше этого срока
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.getenv(
+    'API_CACHE_TIMEOUT', 60 * 60 if os.getenv('REDIS_URL') else 10))
+# Счётчики ограничения частоты запросов
+THROTTLE_CACHE_ALIAS = 'default'
+# Запросы дольше порога (мс) логируются с самыми долгими SQL
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', 500))
+METRICS_SLOW_REQUEST_QUERIES = 10
+# Токен для GET /metrics (Authorization: Bearer <токен>), без него — 404
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Прогрев воркера при запуске WSGI/ASGI-приложения (kinohub_api/warmup.py)
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', '1') == '1'
+# Реплики для чтения: хосты PostgreSQL или файлы SQLite через запятую
+for index, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    replica['HOST' if DB_ENGINE == 'postgresql' else 'NAME'] = location
+    DATABASES[f'replica_{index}'] = replica
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы
+REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+
+# PRAGMA для каждого нового соединения с SQLite: WAL, чтобы чтение
+# не ждало записи, и кеш страниц побольше
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
 }
+# Время жизни пользователя в кеше для токенов без полей роли и для
+# записи. Изменение пользователя сбрасывает кеш только в воркере,
+# который его выполнил, поэтому без REDIS_URL срок короткий
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv(
+    'AUTH_USER_CACHE_TIMEOUT', 60 if os.getenv('REDIS_URL') else 5))
 # Эмуляция почтового сервера
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Доменное имя для сообщения о регистрации
 DOMAIN_NAME = 'registration@kinohub.com'
+# Очередь исходящих писем: пачка на одно соединение, число попыток
+# и задержка перед повтором в секундах (удваивается с каждой попыткой)
+MAIL_QUEUE_BATCH_SIZE = 100
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_DELAY = 60
+MAIL_QUEUE_MAX_RETRY_DELAY = 60 * 60
+# Сколько секунд взятая воркером пачка не видна другим воркерам.
+# Если воркер упал, не отметив письма, они вернутся в очередь
+MAIL_QUEUE_CLAIM_TIMEOUT = 10 * 60
 
 # Работа токенов
 # Пускай пока срок годности access токена будет неделя
@@ -132,6 +258,15 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     # По дефолту и так Bearer, обозначу это явно
 }
+# Полнотекстовый поиск: предел выдачи и словарь PostgreSQL
+SEARCH_MAX_RESULTS = 1000
+SEARCH_CONFIG = 'russian'
+# Предел объектов в одном запросе к .../bulk/
+BULK_MAX_ITEMS = 1000
 # Рейтинг отзывов
 MIN_VAL_SCORE = 1
 MAX_VAL_SCORE = 10
+# Байесовский рейтинг: сколько «средних» отзывов добавляется
+# к отзывам произведения и сколько секунд кешируется средняя оценка
+RATING_PRIOR_WEIGHT = int(os.getenv('RATING_PRIOR_WEIGHT', 10))
+RATING_PRIOR_CACHE_TIMEOUT = 60 * 10
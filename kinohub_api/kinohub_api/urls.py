@@ -1,10 +1,23 @@
-from django.contrib import admin
-from django.urls import include, path
+from django.urls import URLResolver, include, path
+from django.urls.resolvers import RoutePattern
 from django.views.generic import TemplateView
 
+from api.metrics import metrics_view
+
+
+def lazy_include(route, urlconf_name, namespace):
+    """
+    Как path(route, include(urlconf_name)), но модуль с маршрутами
+    импортируется при первом обращении к ним, а не при загрузке URLconf.
+    """
+    return URLResolver(RoutePattern(route), urlconf_name,
+                       app_name=namespace, namespace=namespace)
+
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    lazy_include('admin/', 'kinohub_api.admin_urls', 'admin'),
     path('api/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path(
         'redoc/',
         TemplateView.as_view(template_name='redoc.html'),
@@ -0,0 +1,79 @@
+"""
+Прогрев воркера до приёма запросов.
+
+Django и DRF многое делают лениво на первом запросе: импортируют
+URLconf и компилируют регулярные выражения маршрутов, импортируют
+классы из настроек DRF, собирают метаданные полей и связей моделей,
+по которым ModelSerializer строит поля, загружают переводы,
+хранилища сессий и сообщений и компилятор SQL. Прогрев делает это
+заранее и не обращается к базе, поэтому его можно выполнять
+до fork (gunicorn --preload).
+"""
+import sys
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+
+# Классы, которые DRF импортирует по строкам из настроек
+API_SETTINGS = (
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_THROTTLE_CLASSES',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_FILTER_BACKENDS',
+    'DEFAULT_VERSIONING_CLASS',
+    'UNAUTHENTICATED_USER',
+    'EXCEPTION_HANDLER',
+)
+
+
+def compile_url_patterns(resolver):
+    """Компилирует маршруты, не трогая ещё не загруженные URLconf."""
+    for pattern in resolver.url_patterns:
+        # Регулярное выражение компилируется при первом обращении
+        _ = pattern.pattern.regex
+        if isinstance(pattern, URLResolver) and (
+                not isinstance(pattern.urlconf_name, str)
+                or pattern.urlconf_name in sys.modules):
+            compile_url_patterns(pattern)
+
+
+def fill_model_meta_caches():
+    """
+    Заполняет кеши Options моделей, из которых ModelSerializer строит
+    поля. Сами поля сериализатор строит заново для каждого экземпляра,
+    поэтому прогревать их бесполезно.
+    """
+    for model in apps.get_models():
+        opts = model._meta
+        # Первый вызов строит граф обратных связей всех моделей
+        opts.get_fields()
+        _ = opts.pk, opts.fields, opts.many_to_many, opts.related_objects
+
+
+def import_lazy_modules():
+    import_module(settings.SESSION_ENGINE)
+    import_string(settings.SESSION_SERIALIZER)
+    import_string(settings.MESSAGE_STORAGE)
+    for alias in settings.DATABASES:
+        # ops доступен без открытия соединения
+        import_module(connections[alias].ops.compiler_module)
+
+
+def warm_up():
+    compile_url_patterns(get_resolver())
+    for name in API_SETTINGS:
+        getattr(api_settings, name)
+    fill_model_meta_caches()
+    import_lazy_modules()
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Not found.')
@@ -21,6 +21,11 @@ class TitleAdmin(admin.ModelAdmin):
     list_filter = ('category', 'genre')
     ordering = ('name', 'year', 'rating')
     raw_id_fields = ('category', 'genre')
+    list_select_related = ('category',)
+
+    def get_queryset(self, request):
+        # Жанры подгружаются одним запросом на страницу для get_genre
+        return super().get_queryset(request).prefetch_related('genre')
 
 
 class ReviewAdmin(admin.ModelAdmin):
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Comment, Review
+
+
+def apply_comment_delta(review_id, delta):
+    """Атомарно изменяет счётчик комментариев отзыва."""
+    return Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def recount_comments(review_ids):
+    """
+    Пересчитывает счётчики комментариев отзывов одним сгруппированным
+    запросом и записывает только разошедшиеся.
+    """
+    counts = dict(
+        Comment.objects.filter(review_id__in=review_ids).values(
+            'review_id').annotate(count=Count('id')).order_by().values_list(
+            'review_id', 'count'))
+    changed = []
+    for review in Review.objects.filter(pk__in=review_ids).only(
+            'comments_count'):
+        count = counts.get(review.pk, 0)
+        if review.comments_count != count:
+            review.comments_count = count
+            changed.append(review)
+    if changed:
+        with transaction.atomic():
+            Review.objects.bulk_update(changed, ['comments_count'])
+    return len(changed)
@@ -0,0 +1,105 @@
+"""
+Потоковая выгрузка каталога произведений в NDJSON или CSV.
+
+Произведения читаются курсором .iterator() пачками по chunk_size,
+жанры подгружаются одним запросом на пачку, поэтому память
+не растёт с размером каталога.
+Выгрузка с updated_since не сообщает об удалённых произведениях,
+чтобы их отследить, нужна полная выгрузка.
+"""
+import csv
+import json
+import zlib
+
+from .models import Title
+from .utils import chunked
+
+CSV_COLUMNS = ('id', 'name', 'year', 'description', 'rating',
+               'category', 'genre', 'updated_at')
+FORMATS = ('ndjson', 'csv')
+
+
+def iter_titles(updated_since=None, chunk_size=2000):
+    """Словари произведений с категорией и жанрами в порядке id."""
+    titles = Title.objects.order_by('pk').values(
+        'id', 'name', 'year', 'description', 'rating', 'updated_at',
+        'category__name', 'category__slug')
+    if updated_since is not None:
+        titles = titles.filter(updated_at__gte=updated_since)
+    through = Title.genre.through
+    for chunk in chunked(titles.iterator(chunk_size=chunk_size), chunk_size):
+        genres = {}
+        for title_id, name, slug in through.objects.filter(
+                title_id__in=[row['id'] for row in chunk]).values_list(
+                'title_id', 'genre__name', 'genre__slug'):
+            genres.setdefault(title_id, []).append(
+                {'name': name, 'slug': slug})
+        for row in chunk:
+            yield {
+                'id': row['id'],
+                'name': row['name'],
+                'year': row['year'],
+                'description': row['description'],
+                'rating': row['rating'],
+                'category': {'name': row['category__name'],
+                             'slug': row['category__slug']},
+                'genre': genres.get(row['id'], []),
+                'updated_at': row['updated_at'].isoformat(),
+            }
+
+
+def ndjson_lines(titles):
+    for title in titles:
+        yield json.dumps(title, ensure_ascii=False) + '\n'
+
+
+class LineBuffer:
+    """Файлоподобный объект, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(titles):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(CSV_COLUMNS)
+    for title in titles:
+        yield writer.writerow((
+            title['id'], title['name'], title['year'],
+            title['description'], title['rating'],
+            title['category']['slug'],
+            ','.join(genre['slug'] for genre in title['genre']),
+            title['updated_at'],
+        ))
+
+
+def export_lines(output, updated_since=None, chunk_size=2000):
+    titles = iter_titles(updated_since, chunk_size)
+    if output == 'csv':
+        return csv_lines(titles)
+    return ndjson_lines(titles)
+
+
+def encode(lines, compress=False, buffer_size=64 * 1024):
+    """
+    Кодирует строки в UTF-8 и склеивает в блоки около buffer_size,
+    при compress=True сжимает поток в gzip.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            if compressor is not None:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    block = b''.join(buffer)
+    if compressor is not None:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.export import FORMATS, encode, export_lines
+from reviews.utils import parse_since
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает каталог произведений в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки, по умолчанию stdout.')
+        parser.add_argument('--format', dest='output_format',
+                            choices=FORMATS, default='ndjson')
+        parser.add_argument(
+            '--updated-since',
+            help=('Выгрузить только произведения, изменённые начиная '
+                  'с даты (YYYY-MM-DD или ISO 8601). Удалённые '
+                  'произведения так не отследить, для них нужна '
+                  'полная выгрузка.'))
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжать выгрузку в gzip.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным.')
+        try:
+            updated_since = (options['updated_since']
+                             and parse_since(options['updated_since']))
+        except ValueError as error:
+            raise CommandError(error)
+        blocks = encode(
+            export_lines(options['output_format'], updated_since,
+                         options['chunk_size']),
+            compress=options['gzip'])
+        if options['output'] == '-':
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+            return
+        with open(options['output'], 'wb') as file:
+            for block in blocks:
+                file.write(block)
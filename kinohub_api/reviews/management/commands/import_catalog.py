@@ -0,0 +1,297 @@
+import csv
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from reviews.counters import recount_comments
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import (prior_mean, rank_titles, save_distributions,
+                             score_counts)
+from reviews.search import rebuild_index
+from reviews.signals import catalog_changed
+from reviews.utils import chunked
+from users.models import CustomUser
+
+# Файлы загружаются в этом порядке: каждый следующий
+# ссылается на уже загруженные
+FILES = ('category', 'genre', 'users', 'titles', 'genre_title',
+         'review', 'comments')
+
+
+def read_rows(path):
+    """Построчно читает CSV с заголовком или JSONL."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.suffix == '.jsonl':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+@contextmanager
+def keep_pub_date(model):
+    # auto_now_add перезаписывает дату и в bulk_create,
+    # а при импорте нужна дата из файла
+    field = model._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает каталог из CSV/JSONL-файлов каталога '
+        '--path: category, genre, users, titles, genre_title, review, '
+        'comments (.csv или .jsonl). Категории, жанры и авторы задаются '
+        'slug и username, произведения и отзывы - id. Отсутствующие '
+        'файлы пропускаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', required=True,
+                            help='Каталог с файлами для импорта.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Количество строк в одном INSERT.')
+
+    def handle(self, *args, **options):
+        directory = Path(options['path'])
+        if not directory.is_dir():
+            raise CommandError(f'Каталог {directory} не найден')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        self.batch_size = options['batch_size']
+        self.categories = dict(Category.objects.values_list('slug', 'pk'))
+        self.genres = dict(Genre.objects.values_list('slug', 'pk'))
+        self.users = dict(CustomUser.objects.values_list('username', 'pk'))
+        # Сумма и количество оценок по произведениям из записанных
+        # пачек отзывов
+        self.scores = {}
+        # Отзывы, к которым добавились комментарии
+        self.commented_reviews = set()
+        # Произведения, у которых меняются таблицы лидеров
+        self.ranked_titles = set()
+
+        completed = False
+        try:
+            for name in FILES:
+                path = self.find_file(directory, name)
+                if path is None:
+                    continue
+                self.load_file(name, path)
+            completed = True
+        finally:
+            # Пачки пишутся каждая в своей транзакции, поэтому после
+            # ошибки записанные пачки остаются в базе и для них тоже
+            # обновляются счётчики, рейтинги, таблицы лидеров и поиск
+            self.apply_totals()
+            if not completed:
+                self.stderr.write(
+                    'Импорт прерван. Уже записанные пачки остались в базе, '
+                    'счётчики, рейтинги и поисковый индекс обновлены '
+                    'для них.')
+        self.stdout.write(self.style.SUCCESS('Импорт завершён'))
+
+    def load_file(self, name, path):
+        started = time.monotonic()
+        loaded = getattr(self, f'load_{name}')(self.numbered(path))
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed else loaded
+        self.stdout.write(
+            f'{path.name}: {loaded} строк за {elapsed:.2f} с '
+            f'({rate:.0f} в секунду)')
+
+    def apply_totals(self):
+        """Досчитывает производные данные для записанных пачек."""
+        self.save_scores()
+        self.save_rankings()
+        for review_ids in chunked(self.commented_reviews, self.batch_size):
+            recount_comments(review_ids)
+        self.reset_sequences()
+        rebuild_index()
+        catalog_changed.send(sender=Title)
+
+    def find_file(self, directory, name):
+        for suffix in ('.csv', '.jsonl'):
+            path = directory / f'{name}{suffix}'
+            if path.exists():
+                return path
+        return None
+
+    def numbered(self, path):
+        for line, row in enumerate(read_rows(path), start=1):
+            self.position = f'{path.name}, запись {line}'
+            yield row
+
+    def resolve(self, mapping, key, entity):
+        try:
+            return mapping[key]
+        except KeyError:
+            raise CommandError(
+                f'{self.position}: {entity} "{key}" не найден(а)')
+
+    def insert(self, model, objects, committed=None):
+        """
+        Пишет объекты пачками, каждую в своей транзакции.
+        committed получает каждую записанную пачку.
+        """
+        loaded = 0
+        for batch in chunked(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            if committed is not None:
+                committed(batch)
+            loaded += len(batch)
+        return loaded
+
+    def insert_by_key(self, model, objects, key, mapping):
+        # bulk_create не везде возвращает pk, поэтому после каждой
+        # пачки перечитываем идентификаторы по уникальному ключу
+        loaded = 0
+        for batch in chunked(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            keys = [getattr(obj, key) for obj in batch]
+            mapping.update(model.objects.filter(
+                **{f'{key}__in': keys}).values_list(key, 'pk'))
+            loaded += len(batch)
+        return loaded
+
+    def load_category(self, rows):
+        return self.insert_by_key(Category, (
+            Category(name=row['name'], slug=row['slug']) for row in rows
+        ), 'slug', self.categories)
+
+    def load_genre(self, rows):
+        return self.insert_by_key(Genre, (
+            Genre(name=row['name'], slug=row['slug']) for row in rows
+        ), 'slug', self.genres)
+
+    def load_users(self, rows):
+        return self.insert_by_key(CustomUser, (
+            CustomUser(
+                username=row['username'],
+                email=row['email'],
+                role=row.get('role') or CustomUser.Status.USER.value,
+                bio=row.get('bio') or '',
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+            ) for row in rows
+        ), 'username', self.users)
+
+    def load_titles(self, rows):
+        return self.insert(Title, (
+            Title(
+                id=row['id'],
+                name=row['name'],
+                year=row['year'],
+                description=row.get('description') or None,
+                category_id=self.resolve(
+                    self.categories, row['category'], 'категория'),
+            ) for row in rows
+        ), lambda batch: self.ranked_titles.update(
+            int(title.id) for title in batch))
+
+    def load_genre_title(self, rows):
+        through = Title.genre.through
+        return self.insert(through, (
+            through(
+                title_id=row['title_id'],
+                genre_id=self.resolve(self.genres, row['genre'], 'жанр'),
+            ) for row in rows
+        ), lambda batch: self.ranked_titles.update(
+            int(link.title_id) for link in batch))
+
+    def review_objects(self, rows):
+        for row in rows:
+            yield Review(
+                id=row['id'],
+                title_id=int(row['title_id']),
+                author_id=self.resolve(
+                    self.users, row['author'], 'пользователь'),
+                text=row['text'],
+                score=int(row['score']),
+                pub_date=self.parse_date(row),
+            )
+
+    def load_review(self, rows):
+        with keep_pub_date(Review):
+            return self.insert(Review, self.review_objects(rows),
+                               self.count_scores)
+
+    def count_scores(self, reviews):
+        for review in reviews:
+            total, count = self.scores.get(review.title_id, (0, 0))
+            self.scores[review.title_id] = (total + review.score, count + 1)
+
+    def comment_objects(self, rows):
+        for row in rows:
+            yield Comment(
+                review_id=int(row['review_id']),
+                author_id=self.resolve(
+                    self.users, row['author'], 'пользователь'),
+                text=row['text'],
+                pub_date=self.parse_date(row),
+            )
+
+    def load_comments(self, rows):
+        with keep_pub_date(Comment):
+            return self.insert(
+                Comment, self.comment_objects(rows),
+                lambda batch: self.commented_reviews.update(
+                    comment.review_id for comment in batch))
+
+    def parse_date(self, row):
+        if not row.get('pub_date'):
+            return timezone.now()
+        value = parse_datetime(row['pub_date'])
+        if value is None:
+            raise CommandError(
+                f'{self.position}: неверная дата "{row["pub_date"]}"')
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def save_scores(self):
+        """
+        Добавляет оценки из файла к счётчикам произведений
+        и пересобирает их распределения оценок.
+        """
+        for title_ids in chunked(self.scores, self.batch_size):
+            titles = list(Title.objects.filter(pk__in=title_ids).only(
+                'score_sum', 'reviews_count'))
+            now = timezone.now()
+            for title in titles:
+                total, count = self.scores[title.pk]
+                title.score_sum += total
+                title.reviews_count += count
+                title.rating = title.score_sum / title.reviews_count
+                title.updated_at = now
+            title_ids = [title.pk for title in titles]
+            with transaction.atomic():
+                Title.objects.bulk_update(titles, [
+                    'score_sum', 'reviews_count', 'rating', 'updated_at'])
+                save_distributions(score_counts(title_ids), title_ids)
+
+    def save_rankings(self):
+        """Пересобирает строки таблиц лидеров затронутых произведений."""
+        mean = prior_mean(refresh=True)
+        title_ids = sorted(self.ranked_titles.union(self.scores))
+        for chunk in chunked(title_ids, self.batch_size):
+            rank_titles(chunk, mean)
+
+    def reset_sequences(self):
+        # Произведения и отзывы вставлялись с явными id
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Title, Review])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from reviews.models import Review, Title
+from reviews.ratings import prior_mean, recompute_titles
+from reviews.utils import chunked, parse_since
+
+
+def recompute_in_thread(title_ids):
+    # У каждого потока своё соединение с БД, закрываем его сами
+    try:
+        return recompute_titles(title_ids)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинг произведений по таблице отзывов '
+            'пачками: один сгруппированный запрос и bulk_update на пачку.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Количество произведений в одной пачке.')
+        parser.add_argument(
+            '--since',
+            help=('Пересчитать только произведения с отзывами, '
+                  'опубликованными начиная с даты (YYYY-MM-DD или ISO 8601).'
+                  ' Удалённые отзывы так не отследить, для них нужен '
+                  'полный пересчёт.'))
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help=('Количество потоков. На SQLite запись всё равно '
+                  'последовательная, имеет смысл для PostgreSQL.'))
+
+    def get_title_ids(self, since):
+        if since is None:
+            return Title.objects.order_by('pk').values_list(
+                'pk', flat=True).iterator()
+        return Review.objects.filter(pub_date__gte=since).order_by(
+            'title_id').values_list(
+            'title_id', flat=True).distinct().iterator()
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError(
+                '--chunk-size и --workers должны быть положительными.')
+        try:
+            since = options['since'] and parse_since(options['since'])
+        except ValueError as error:
+            raise CommandError(error)
+        # Идентификаторы выбираем заранее, чтобы не держать курсор
+        # открытым во время записи
+        title_ids = list(self.get_title_ids(since))
+        chunks = chunked(title_ids, options['chunk_size'])
+        # Таблицы лидеров пересобираются по свежей средней по каталогу,
+        # она считается по отзывам, а не по пересчитываемым счётчикам
+        prior_mean(refresh=True)
+
+        started = time.monotonic()
+        if options['workers'] == 1:
+            processed = sum(map(recompute_titles, chunks))
+        else:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                processed = sum(executor.map(recompute_in_thread, chunks))
+        elapsed = time.monotonic() - started
+
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано произведений: {processed} '
+            f'за {elapsed:.2f} с ({rate:.0f} в секунду)'))
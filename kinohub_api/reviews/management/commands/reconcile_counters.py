@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.counters import recount_comments
+from reviews.models import Review, Title
+from reviews.ratings import prior_mean, recompute_titles
+from reviews.utils import chunked
+
+
+class Command(BaseCommand):
+    help = ('Сверяет денормализованные счётчики (отзывы и рейтинг '
+            'произведений, комментарии отзывов) с таблицами '
+            'и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным.')
+        chunk_size = options['chunk_size']
+        # Средняя по каталогу считается по отзывам, а не по сверяемым
+        # счётчикам, таблицы лидеров пересобираются уже по ней
+        prior_mean(refresh=True)
+
+        title_ids = list(Title.objects.order_by('pk').values_list(
+            'pk', flat=True).iterator())
+        for chunk in chunked(title_ids, chunk_size):
+            recompute_titles(chunk)
+        self.stdout.write(f'Произведений проверено: {len(title_ids)}')
+
+        review_ids = list(Review.objects.order_by('pk').values_list(
+            'pk', flat=True).iterator())
+        fixed = sum(recount_comments(chunk)
+                    for chunk in chunked(review_ids, chunk_size))
+        self.stdout.write(self.style.SUCCESS(
+            f'Отзывов проверено: {len(review_ids)}, '
+            f'исправлено счётчиков комментариев: {fixed}'))
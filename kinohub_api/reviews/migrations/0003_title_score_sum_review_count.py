@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+def fill_score_totals(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    totals = Review.objects.values('title_id').annotate(
+        total=models.Sum('score'), count=models.Count('id'))
+    titles = []
+    for row in totals:
+        titles.append(Title(
+            pk=row['title_id'],
+            score_sum=row['total'],
+            review_count=row['count'],
+            rating=row['total'] / row['count'],
+        ))
+    Title.objects.bulk_update(
+        titles, ['score_sum', 'review_count', 'rating'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Сумма оценок всех отзывов', verbose_name='Сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, help_text='Количество отзывов на произведение', verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(fill_score_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE reviews_title_fts USING fts5("
+    "name, description, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO reviews_title_fts (rowid, name, description) "
+    "SELECT id, name, description FROM reviews_title",
+    "CREATE VIRTUAL TABLE reviews_review_fts USING fts5("
+    "text, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO reviews_review_fts (rowid, text) "
+    "SELECT id, text FROM reviews_review",
+]
+SQLITE_BACKWARD = [
+    'DROP TABLE reviews_title_fts',
+    'DROP TABLE reviews_review_fts',
+]
+POSTGRES_FORWARD = [
+    "CREATE INDEX reviews_title_search_idx ON reviews_title USING GIN "
+    "(to_tsvector('{config}'::regconfig, coalesce(name, '') || ' ' "
+    "|| coalesce(description, '')))",
+    "CREATE INDEX reviews_review_search_idx ON reviews_review USING GIN "
+    "(to_tsvector('{config}'::regconfig, text))",
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX reviews_title_search_idx',
+    'DROP INDEX reviews_review_search_idx',
+]
+
+
+def run_statements(schema_editor, statements):
+    config = getattr(settings, 'SEARCH_CONFIG', 'russian')
+    for statement in statements:
+        schema_editor.execute(statement.format(config=config))
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_FORWARD)
+    elif vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_score_sum_review_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def fill_comments_count(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    counts = Comment.objects.values('review_id').annotate(
+        count=models.Count('id')).order_by()
+    Review.objects.bulk_update(
+        [Review(pk=row['review_id'], comments_count=row['count'])
+         for row in counts],
+        ['comments_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_updated_at'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='title',
+            old_name='review_count',
+            new_name='reviews_count',
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_comments_count, migrations.RunPython.noop),
+    ]
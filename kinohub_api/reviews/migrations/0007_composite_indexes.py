@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+# Фильтр ?genre= идёт от жанра к произведениям: индекс (genre_id, title_id)
+# покрывает соединение без обращения к таблице связей
+GENRE_TITLE_INDEX = 'title_genre_genre_title_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_reviews_count_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', '-pub_date', '-id'], name='review_title_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', '-pub_date', '-id'], name='comment_review_pub_date_idx'),
+        ),
+        migrations.RunSQL(
+            f'CREATE INDEX {GENRE_TITLE_INDEX} '
+            'ON reviews_title_genre (genre_id, title_id);',
+            f'DROP INDEX {GENRE_TITLE_INDEX};',
+        ),
+    ]
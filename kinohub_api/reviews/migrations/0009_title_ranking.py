@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_title_ranking(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleRanking = apps.get_model('reviews', 'TitleRanking')
+    totals = Title.objects.aggregate(
+        total=models.Sum('score_sum'), count=models.Sum('reviews_count'))
+    mean = (totals['total'] / totals['count'] if totals['count']
+            else (settings.MIN_VAL_SCORE + settings.MAX_VAL_SCORE) / 2)
+    weight = settings.RATING_PRIOR_WEIGHT
+    genres = defaultdict(list)
+    for title_id, genre_id in Title.genre.through.objects.values_list(
+            'title_id', 'genre_id').iterator():
+        genres[title_id].append(genre_id)
+    rankings = []
+    for title_id, category_id, score_sum, count in Title.objects.values_list(
+            'pk', 'category_id', 'score_sum', 'reviews_count').iterator():
+        weighted = (weight * mean + score_sum) / (weight + count)
+        scopes = [('all', 0), ('category', category_id)]
+        scopes += [('genre', genre_id) for genre_id in genres[title_id]]
+        rankings += [
+            TitleRanking(kind=kind, scope_id=scope_id, title_id=title_id,
+                         weighted_rating=weighted)
+            for kind, scope_id in scopes]
+    TitleRanking.objects.bulk_create(rankings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_rating_distribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('all', 'Весь каталог'), ('category', 'Категория'), ('genre', 'Жанр')], max_length=8, verbose_name='Таблица')),
+                ('scope_id', models.PositiveIntegerField(default=0, verbose_name='Категория или жанр')),
+                ('weighted_rating', models.FloatField(help_text='Средняя оценка, стянутая к средней по каталогу', verbose_name='Байесовский рейтинг')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Места в рейтинге',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['kind', 'scope_id', '-weighted_rating', '-title'], name='title_ranking_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titleranking',
+            constraint=models.UniqueConstraint(fields=('kind', 'scope_id', 'title'), name='unique_title_ranking'),
+        ),
+        migrations.RunPython(fill_title_ranking, migrations.RunPython.noop),
+    ]
@@ -79,9 +79,29 @@ class Title(models.Model):
         verbose_name='Средняя оценка',
         help_text='Средняя оценка',
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок',
+        help_text='Сумма оценок всех отзывов',
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов',
+        help_text='Количество отзывов на произведение',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения',
+        help_text='Дата последнего изменения произведения или его рейтинга',
+    )
 
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['category', 'year'],
+                         name='title_category_year_idx'),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
@@ -136,6 +156,19 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        review = super().from_db(db, field_names, values)
+        # Произведение и оценка, уже учтённые в счётчиках: по ним
+        # post_save считает изменение
+        loaded = dict(zip(field_names, values))
+        review.counted = (loaded.get('title_id'), loaded.get('score'))
+        return review
 
     class Meta:
         ordering = ['-pub_date']
@@ -143,6 +176,10 @@ class Review(models.Model):
             models.UniqueConstraint(
                 fields=['author', 'title'], name="unique_review")
         ]
+        indexes = [
+            models.Index(fields=['title', '-pub_date', '-id'],
+                         name='review_title_pub_date_idx'),
+        ]
         verbose_name = 'Обзор',
         verbose_name_plural = 'Обзоры'
 
@@ -170,7 +207,107 @@ class Comment(models.Model):
         verbose_name='Дата добавления',
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        comment = super().from_db(db, field_names, values)
+        # Отзыв, в счётчике которого комментарий уже учтён
+        comment.counted_review_id = dict(
+            zip(field_names, values)).get('review_id')
+        return comment
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['review', '-pub_date', '-id'],
+                         name='comment_review_pub_date_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+
+
+# Оценки, для которых у RatingDistribution есть поля
+SCORES = range(settings.MIN_VAL_SCORE, settings.MAX_VAL_SCORE + 1)
+
+
+class RatingDistribution(models.Model):
+    """
+    Число отзывов на произведение с каждой оценкой, поле score_<оценка>.
+    Обновляется вместе с рейтингом, см. reviews.ratings.
+    """
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rating_distribution',
+        verbose_name='Произведение',
+    )
+    score_1 = models.PositiveIntegerField('Оценок 1', default=0)
+    score_2 = models.PositiveIntegerField('Оценок 2', default=0)
+    score_3 = models.PositiveIntegerField('Оценок 3', default=0)
+    score_4 = models.PositiveIntegerField('Оценок 4', default=0)
+    score_5 = models.PositiveIntegerField('Оценок 5', default=0)
+    score_6 = models.PositiveIntegerField('Оценок 6', default=0)
+    score_7 = models.PositiveIntegerField('Оценок 7', default=0)
+    score_8 = models.PositiveIntegerField('Оценок 8', default=0)
+    score_9 = models.PositiveIntegerField('Оценок 9', default=0)
+    score_10 = models.PositiveIntegerField('Оценок 10', default=0)
+
+    class Meta:
+        verbose_name = 'Распределение оценок'
+        verbose_name_plural = 'Распределения оценок'
+
+    @staticmethod
+    def field_name(score):
+        return f'score_{score}'
+
+    def counts(self):
+        """Оценка -> число отзывов."""
+        return {score: getattr(self, self.field_name(score))
+                for score in SCORES}
+
+    def __str__(self):
+        return f'Распределение оценок: {self.title_id}'
+
+
+class TitleRanking(models.Model):
+    """
+    Место произведения в таблице лидеров: всего каталога (scope_id=0),
+    категории или жанра. Строки на каждую таблицу нужны, чтобы страница
+    лидеров читалась по индексу без сортировки всех произведений.
+    """
+    ALL = 'all'
+    CATEGORY = 'category'
+    GENRE = 'genre'
+    KINDS = (
+        (ALL, 'Весь каталог'),
+        (CATEGORY, 'Категория'),
+        (GENRE, 'Жанр'),
+    )
+
+    kind = models.CharField('Таблица', max_length=8, choices=KINDS)
+    scope_id = models.PositiveIntegerField(
+        'Категория или жанр', default=0)
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='rankings',
+        verbose_name='Произведение',
+    )
+    weighted_rating = models.FloatField(
+        'Байесовский рейтинг',
+        help_text='Средняя оценка, стянутая к средней по каталогу',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'scope_id', 'title'],
+                name='unique_title_ranking'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['kind', 'scope_id', '-weighted_rating', '-title'],
+                name='title_ranking_top_idx'),
+        ]
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтинге'
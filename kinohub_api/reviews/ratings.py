@@ -0,0 +1,251 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (Avg, Case, Count, ExpressionWrapper, F,
+                              FloatField, OuterRef, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import SCORES, RatingDistribution, Review, Title, TitleRanking
+from .signals import catalog_changed
+
+PRIOR_MEAN_KEY = 'ratings:prior-mean'
+
+
+def apply_review_delta(title_id, score_delta, count_delta):
+    """
+    Атомарно изменяет сумму оценок и число отзывов произведения
+    и пересчитывает по ним рейтинг одним UPDATE.
+    F-выражения ссылаются на значения до обновления.
+    """
+    new_sum = F('score_sum') + score_delta
+    new_count = F('reviews_count') + count_delta
+    return Title.objects.filter(pk=title_id).update(
+        score_sum=new_sum,
+        reviews_count=new_count,
+        rating=Case(
+            When(reviews_count__lte=-count_delta, then=Value(None)),
+            default=Cast(new_sum, FloatField()) / new_count,
+            output_field=FloatField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def apply_score_change(title_id, old_score=None, new_score=None):
+    """
+    Учитывает новый отзыв (old_score=None), изменение оценки
+    или удалённый отзыв (new_score=None) в счётчиках, рейтинге
+    и распределении оценок и таблицах лидеров произведения.
+    """
+    count_delta = (new_score is not None) - (old_score is not None)
+    apply_review_delta(title_id, (new_score or 0) - (old_score or 0),
+                       count_delta)
+    if old_score == new_score:
+        return
+    # Строк без нового отзыва не создаём: при каскадном удалении
+    # произведения они пережили бы его
+    rebuild = new_score is not None
+    refresh_weighted_rating(title_id, rebuild)
+    changes = {}
+    if old_score is not None:
+        field = RatingDistribution.field_name(old_score)
+        changes[field] = F(field) - 1
+    if new_score is not None:
+        field = RatingDistribution.field_name(new_score)
+        changes[field] = F(field) + 1
+    if not RatingDistribution.objects.filter(
+            title_id=title_id).update(**changes) and rebuild:
+        # Произведение загружено через bulk_create и распределения
+        # у него нет: строим по отзывам, текущий уже среди них
+        save_distributions(score_counts([title_id]), [title_id])
+
+
+def score_counts(title_ids):
+    """{title_id: {оценка: число отзывов}} одним запросом к отзывам."""
+    counts = defaultdict(dict)
+    for title_id, score, count in Review.objects.filter(
+            title_id__in=title_ids).values_list(
+            'title_id', 'score').annotate(count=Count('id')).order_by():
+        counts[title_id][score] = count
+    return counts
+
+
+def save_distributions(counts, title_ids):
+    """
+    Записывает распределения оценок, которые разошлись с counts,
+    недостающие создаёт. Возвращает число записанных.
+    """
+    existing = RatingDistribution.objects.in_bulk(title_ids)
+    created, changed = [], []
+    for title_id in title_ids:
+        actual = {score: counts.get(title_id, {}).get(score, 0)
+                  for score in SCORES}
+        distribution = existing.get(title_id)
+        if distribution is None:
+            distribution = RatingDistribution(title_id=title_id)
+            created.append(distribution)
+        elif distribution.counts() != actual:
+            changed.append(distribution)
+        else:
+            continue
+        for score, count in actual.items():
+            setattr(distribution, distribution.field_name(score), count)
+    # Строку мог успеть создать параллельный запрос
+    RatingDistribution.objects.bulk_create(created, ignore_conflicts=True)
+    RatingDistribution.objects.bulk_update(
+        changed, [RatingDistribution.field_name(score) for score in SCORES])
+    return len(created) + len(changed)
+
+
+def get_distribution(title_id):
+    """
+    Распределение оценок произведения, при отсутствии строится.
+    Построенное не перечитывается: чтение может уйти на реплику,
+    куда запись ещё не дошла.
+    """
+    distribution = RatingDistribution.objects.filter(
+        title_id=title_id).first()
+    if distribution is None and Title.objects.filter(pk=title_id).exists():
+        counts = score_counts([title_id])
+        save_distributions(counts, [title_id])
+        distribution = RatingDistribution(title_id=title_id)
+        for score, count in counts.get(title_id, {}).items():
+            setattr(distribution, distribution.field_name(score), count)
+    return distribution
+
+
+def prior_mean(refresh=False):
+    """
+    Средняя оценка по всем отзывам, считается по счётчикам
+    произведений и кешируется на RATING_PRIOR_CACHE_TIMEOUT.
+    refresh=True пересчитывает её в обход кеша по самим отзывам:
+    так средняя верна, даже если счётчики ещё не сверены.
+    """
+    mean = None if refresh else cache.get(PRIOR_MEAN_KEY)
+    if mean is None:
+        if refresh:
+            mean = Review.objects.aggregate(mean=Avg('score'))['mean']
+        else:
+            totals = Title.objects.aggregate(
+                total=Sum('score_sum'), count=Sum('reviews_count'))
+            mean = totals['count'] and totals['total'] / totals['count']
+        if not mean:
+            mean = (settings.MIN_VAL_SCORE + settings.MAX_VAL_SCORE) / 2
+        cache.set(PRIOR_MEAN_KEY, mean, settings.RATING_PRIOR_CACHE_TIMEOUT)
+    return mean
+
+
+def bayesian_rating(score_sum, count, mean):
+    """
+    Средняя оценка, стянутая к mean так, будто у произведения есть ещё
+    RATING_PRIOR_WEIGHT отзывов с оценкой mean: пара отзывов
+    с десятками не поднимает произведение выше сотни хороших.
+    """
+    weight = settings.RATING_PRIOR_WEIGHT
+    return (weight * mean + score_sum) / (weight + count)
+
+
+def distribution_stats(counts):
+    """Число отзывов, среднее, медиана и байесовский рейтинг."""
+    count = sum(counts.values())
+    if not count:
+        return {'count': 0, 'mean': None, 'median': None,
+                'bayesian_rating': None}
+    score_sum = sum(score * number for score, number in counts.items())
+    # Медиана — среднее двух центральных оценок (при нечётном числе
+    # отзывов это одна и та же оценка)
+    middle = ((count - 1) // 2, count // 2)
+    medians, seen = [], 0
+    for score in sorted(counts):
+        seen += counts[score]
+        while len(medians) < 2 and middle[len(medians)] < seen:
+            medians.append(score)
+    return {
+        'count': count,
+        'mean': score_sum / count,
+        'median': sum(medians) / 2,
+        'bayesian_rating': bayesian_rating(score_sum, count, prior_mean()),
+    }
+
+
+def rank_titles(title_ids, mean=None):
+    """
+    Пересобирает строки таблиц лидеров произведений: всего каталога,
+    категории и каждого жанра, с байесовским рейтингом по счётчикам.
+    """
+    mean = prior_mean() if mean is None else mean
+    genres = defaultdict(list)
+    for title_id, genre_id in Title.genre.through.objects.filter(
+            title_id__in=title_ids).values_list('title_id', 'genre_id'):
+        genres[title_id].append(genre_id)
+    rankings = []
+    for title_id, category_id, score_sum, count in Title.objects.filter(
+            pk__in=title_ids).values_list(
+            'pk', 'category_id', 'score_sum', 'reviews_count'):
+        scopes = [(TitleRanking.ALL, 0), (TitleRanking.CATEGORY, category_id)]
+        scopes += [(TitleRanking.GENRE, genre_id)
+                   for genre_id in genres[title_id]]
+        weighted = bayesian_rating(score_sum, count, mean)
+        rankings += [
+            TitleRanking(kind=kind, scope_id=scope_id, title_id=title_id,
+                         weighted_rating=weighted)
+            for kind, scope_id in scopes]
+    with transaction.atomic():
+        TitleRanking.objects.filter(title_id__in=title_ids).delete()
+        TitleRanking.objects.bulk_create(rankings, batch_size=1000)
+
+
+def refresh_weighted_rating(title_id, rebuild=True):
+    """
+    Переносит счётчики произведения в его строки таблиц лидеров
+    одним UPDATE, при rebuild недостающие строки создаются.
+    Средняя по каталогу берётся из кеша и со временем уплывает,
+    все строки выравнивает recompute_ratings.
+    """
+    weighted = Title.objects.filter(pk=OuterRef('title_id')).values(
+        weighted=ExpressionWrapper(
+            bayesian_rating(F('score_sum'), F('reviews_count'),
+                            prior_mean()),
+            output_field=FloatField()))
+    if not TitleRanking.objects.filter(title_id=title_id).update(
+            weighted_rating=Subquery(weighted)) and rebuild:
+        # Произведение загружено через bulk_create без строк рейтинга
+        rank_titles([title_id])
+
+
+def recompute_titles(title_ids):
+    """
+    Пересчитывает счётчики, рейтинг и распределение оценок переданных
+    произведений одним сгруппированным запросом к отзывам.
+    Записываются только произведения, у которых что-то изменилось,
+    строки таблиц лидеров пересобираются у всех.
+    """
+    counts = score_counts(title_ids)
+    now = timezone.now()
+    titles = list(Title.objects.filter(pk__in=title_ids).only(
+        'score_sum', 'reviews_count', 'rating'))
+    changed = []
+    for title in titles:
+        scores = counts.get(title.pk, {})
+        total = sum(score * count for score, count in scores.items())
+        count = sum(scores.values())
+        if (title.score_sum, title.reviews_count) == (total, count):
+            continue
+        title.score_sum = total
+        title.reviews_count = count
+        title.rating = total / count if count else None
+        title.updated_at = now
+        changed.append(title)
+    found_ids = [title.pk for title in titles]
+    with transaction.atomic():
+        Title.objects.bulk_update(changed, [
+            'score_sum', 'reviews_count', 'rating', 'updated_at'])
+        save_distributions(counts, found_ids)
+        rank_titles(found_ids)
+    if changed:
+        catalog_changed.send(sender=Title)
+    return len(title_ids)
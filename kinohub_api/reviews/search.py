@@ -0,0 +1,131 @@
+"""
+Полнотекстовый поиск по произведениям и отзывам.
+
+На SQLite используются таблицы FTS5, их поддерживают сигналы.
+На PostgreSQL - GIN-индексы по to_tsvector, которые база обновляет
+сама. На прочих СУБД поиск сводится к icontains без ранжирования.
+"""
+from django.conf import settings
+from django.db import connection
+
+from .models import Review, Title
+
+TITLE_FTS_TABLE = 'reviews_title_fts'
+REVIEW_FTS_TABLE = 'reviews_review_fts'
+
+# Выражения должны совпадать с индексами из миграции,
+# иначе PostgreSQL не сможет их использовать
+TITLE_TSVECTOR = (
+    "to_tsvector(%s::regconfig, coalesce(t.name, '') || ' ' "
+    "|| coalesce(t.description, ''))")
+REVIEW_TSVECTOR = "to_tsvector(%s::regconfig, r.text)"
+
+
+def fts5_query(query):
+    # Каждое слово в кавычках: спецсимволы FTS5 не ломают запрос,
+    # слова объединяются через AND
+    terms = query.split()
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def fetch_ids(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_title_ids(query, limit=None):
+    """Идентификаторы произведений по убыванию релевантности."""
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    if not query.split():
+        return []
+    if connection.vendor == 'sqlite':
+        return fetch_ids(
+            f'SELECT rowid FROM {TITLE_FTS_TABLE} '
+            f'WHERE {TITLE_FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [fts5_query(query), limit])
+    if connection.vendor == 'postgresql':
+        config = settings.SEARCH_CONFIG
+        return fetch_ids(
+            f'SELECT t.id FROM reviews_title t, '
+            f'plainto_tsquery(%s::regconfig, %s) q '
+            f'WHERE {TITLE_TSVECTOR} @@ q '
+            f'ORDER BY ts_rank({TITLE_TSVECTOR}, q) DESC LIMIT %s',
+            [config, query, config, config, limit])
+    return list(Title.objects.filter(name__icontains=query).values_list(
+        'pk', flat=True)[:limit])
+
+
+def search_review_ids(query, title_id=None, limit=None):
+    """Идентификаторы отзывов по убыванию релевантности."""
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    if not query.split():
+        return []
+    if connection.vendor == 'sqlite':
+        sql = (f'SELECT f.rowid FROM {REVIEW_FTS_TABLE} f '
+               f'JOIN reviews_review r ON r.id = f.rowid '
+               f'WHERE f.{REVIEW_FTS_TABLE} MATCH %s')
+        params = [fts5_query(query)]
+        order = 'ORDER BY f.rank LIMIT %s'
+    elif connection.vendor == 'postgresql':
+        config = settings.SEARCH_CONFIG
+        sql = (f'SELECT r.id FROM reviews_review r, '
+               f'plainto_tsquery(%s::regconfig, %s) q '
+               f'WHERE {REVIEW_TSVECTOR} @@ q')
+        params = [config, query, config]
+        order = f'ORDER BY ts_rank({REVIEW_TSVECTOR}, q) DESC LIMIT %s'
+    else:
+        reviews = Review.objects.filter(text__icontains=query)
+        if title_id is not None:
+            reviews = reviews.filter(title_id=title_id)
+        return list(reviews.values_list('pk', flat=True)[:limit])
+
+    if title_id is not None:
+        sql += ' AND r.title_id = %s'
+        params.append(title_id)
+    if connection.vendor == 'postgresql':
+        params.append(config)
+    return fetch_ids(f'{sql} {order}', params + [limit])
+
+
+def index_titles(titles):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {TITLE_FTS_TABLE} '
+            f'(rowid, name, description) VALUES (%s, %s, %s)',
+            [(title.pk, title.name, title.description) for title in titles])
+
+
+def index_reviews(reviews):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {REVIEW_FTS_TABLE} (rowid, text) '
+            f'VALUES (%s, %s)',
+            [(review.pk, review.text) for review in reviews])
+
+
+def remove_from_index(table, ids):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {table} WHERE rowid = %s', [(pk,) for pk in ids])
+
+
+def rebuild_index():
+    """Заполняет таблицы FTS5 заново, например после bulk_create."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TITLE_FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TITLE_FTS_TABLE} (rowid, name, description) '
+            f'SELECT id, name, description FROM reviews_title')
+        cursor.execute(f'DELETE FROM {REVIEW_FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {REVIEW_FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM reviews_review')
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Отправляется после массовых изменений каталога в обход save()
+# (bulk_create, bulk_update), на которые не приходят post_save
+catalog_changed = Signal()
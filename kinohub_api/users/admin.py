@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import CustomUser
+from .models import CustomUser, OutgoingMail
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -17,4 +17,20 @@ class UserAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class OutgoingMailAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipient',
+        'subject',
+        'status',
+        'attempts',
+        'created_at',
+        'sent_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipient',)
+    # В тексте коды подтверждения
+    exclude = ('message',)
+
+
 admin.site.register(CustomUser, UserAdmin)
+admin.site.register(OutgoingMail, OutgoingMailAdmin)
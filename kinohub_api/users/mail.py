@@ -0,0 +1,156 @@
+"""
+Очередь исходящих писем.
+
+Запрос только ставит письмо в очередь, отправляет его
+воркер run_mail_worker пачками через одно SMTP-соединение.
+Текст письма (в нём коды подтверждения) стирается, как только
+письмо отправлено или попытки исчерпаны.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import (Avg, Count, DurationField, ExpressionWrapper,
+                              F, Max)
+from django.utils import timezone
+
+from .models import OutgoingMail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_mail(subject, message, from_email, recipient):
+    return OutgoingMail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipient=recipient,
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой."""
+    return datetime.timedelta(seconds=min(
+        settings.MAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.MAIL_QUEUE_MAX_RETRY_DELAY))
+
+
+def mark_failed(mail, error, now):
+    mail.attempts += 1
+    mail.last_error = str(error)
+    if mail.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+        mail.status = OutgoingMail.Status.FAILED
+        mail.message = ''
+        logger.error('Письмо %s не отправлено: %s', mail.pk, error)
+    else:
+        mail.next_attempt_at = now + retry_delay(mail.attempts)
+
+
+def claim_batch(batch_size, now):
+    """
+    Забирает пачку писем в короткой транзакции: переносит их следующую
+    попытку на MAIL_QUEUE_CLAIM_TIMEOUT вперёд, чтобы другие воркеры
+    их не взяли, пока идёт отправка.
+    """
+    with transaction.atomic():
+        # Несколько воркеров не возьмут одни и те же письма
+        batch = list(OutgoingMail.objects.select_for_update(
+            skip_locked=True).filter(
+            status=OutgoingMail.Status.PENDING,
+            next_attempt_at__lte=now)[:batch_size])
+        if batch:
+            OutgoingMail.objects.filter(
+                pk__in=[mail.pk for mail in batch]).update(
+                next_attempt_at=now + datetime.timedelta(
+                    seconds=settings.MAIL_QUEUE_CLAIM_TIMEOUT))
+    return batch
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:  # pylint: disable=broad-except
+        logger.warning('Не удалось закрыть SMTP-соединение', exc_info=True)
+
+
+def send_pending(batch_size=None):
+    """
+    Отправляет пачку писем, для которых подошло время попытки.
+    Письма отправляются вне транзакции через одно SMTP-соединение,
+    после ошибки отправки соединение открывается заново.
+    Возвращает количество отправленных и неудачных писем.
+    """
+    batch_size = batch_size or settings.MAIL_QUEUE_BATCH_SIZE
+    now = timezone.now()
+    batch = claim_batch(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        for index, mail in enumerate(batch):
+            try:
+                # Уже открытое соединение не переоткрывается
+                connection.open()
+            except Exception as error:  # pylint: disable=broad-except
+                # Сервер недоступен: остаток пачки ждёт следующей попытки
+                for rest in batch[index:]:
+                    mark_failed(rest, error, now)
+                failed += len(batch) - index
+                break
+            try:
+                EmailMessage(
+                    subject=mail.subject,
+                    body=mail.message,
+                    from_email=mail.from_email,
+                    to=[mail.recipient],
+                    connection=connection,
+                ).send()
+            except Exception as error:  # pylint: disable=broad-except
+                mark_failed(mail, error, now)
+                failed += 1
+                # Ошибка могла оборвать соединение
+                close_quietly(connection)
+            else:
+                mail.status = OutgoingMail.Status.SENT
+                mail.message = ''
+                mail.sent_at = timezone.now()
+                mail.attempts += 1
+                sent += 1
+    finally:
+        close_quietly(connection)
+        OutgoingMail.objects.bulk_update(batch, [
+            'status', 'message', 'attempts', 'next_attempt_at',
+            'last_error', 'sent_at'])
+    return sent, failed
+
+
+def queue_metrics(window=datetime.timedelta(hours=1)):
+    """
+    Глубина очереди, возраст самого старого письма в ней
+    и задержка доставки писем, отправленных за последний window.
+    """
+    now = timezone.now()
+    pending = OutgoingMail.objects.filter(status=OutgoingMail.Status.PENDING)
+    oldest = pending.order_by('created_at').values_list(
+        'created_at', flat=True).first()
+    latency = ExpressionWrapper(F('sent_at') - F('created_at'),
+                                output_field=DurationField())
+    sent = OutgoingMail.objects.filter(
+        status=OutgoingMail.Status.SENT, sent_at__gte=now - window).aggregate(
+        count=Count('id'), avg=Avg(latency), max=Max(latency))
+    return {
+        'depth': pending.count(),
+        'failed': OutgoingMail.objects.filter(
+            status=OutgoingMail.Status.FAILED).count(),
+        'oldest_age_seconds': (
+            (now - oldest).total_seconds() if oldest else 0.0),
+        'sent_in_window': sent['count'],
+        'latency_avg_seconds': (
+            sent['avg'].total_seconds() if sent['count'] else 0.0),
+        'latency_max_seconds': (
+            sent['max'].total_seconds() if sent['count'] else 0.0),
+    }
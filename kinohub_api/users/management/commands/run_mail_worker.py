@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.mail import queue_metrics, send_pending
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди пачками через одно '
+            'SMTP-соединение, с повторами и экспоненциальной задержкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Писем за одно соединение.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза в секундах при пустой очереди.')
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать очередь и завершиться.')
+        parser.add_argument('--metrics', action='store_true',
+                            help='Вывести метрики очереди и завершиться.')
+
+    def report(self):
+        metrics = queue_metrics()
+        self.stdout.write(' '.join(
+            f'{name}={value:g}' if isinstance(value, float)
+            else f'{name}={value}'
+            for name, value in metrics.items()))
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            self.report()
+            return
+        while True:
+            sent, failed = send_pending(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено: {sent}, с ошибкой: {failed}')
+                continue
+            if options['once']:
+                self.report()
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_delivered_mail(apps, schema_editor):
+    OutgoingMail = apps.get_model('users', 'OutgoingMail')
+    OutgoingMail.objects.exclude(status='pending').update(message='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_outgoingmail'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_delivered_mail,
+                             migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 
 class CustomUser(AbstractUser):
@@ -68,3 +69,64 @@ class CustomUser(AbstractUser):
         ordering = ('id',)
         verbose_name = 'пользователь'
         verbose_name_plural = 'пользователи'
+
+
+class OutgoingMail(models.Model):
+    """Письмо в очереди на отправку, его отправляет run_mail_worker."""
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает отправки'
+        SENT = 'sent', 'Отправлено'
+        FAILED = 'failed', 'Не удалось отправить'
+
+    subject = models.CharField(
+        'Тема',
+        max_length=255,
+    )
+    message = models.TextField(
+        'Текст письма',
+    )
+    from_email = models.EmailField(
+        'Отправитель',
+    )
+    recipient = models.EmailField(
+        'Получатель',
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток отправки',
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        'Поставлено в очередь',
+        auto_now_add=True,
+    )
+    sent_at = models.DateTimeField(
+        'Отправлено',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outgoing_mail_queue_idx'),
+        ]
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'исходящие письма'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import cache
+
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кеш каталога и счётчики ограничений живут в памяти процесса
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [django_user_model.objects.create(
+        username=f'author{i}', email=f'author{i}@example.com')
+        for i in range(3)]
+
+
+@pytest.fixture
+def catalog(authors):
+    """
+    Произведения с жанрами, у первого отзывы всех авторов,
+    у первого отзыва комментарии всех авторов.
+    """
+    categories = [Category.objects.create(name=f'Категория {i}',
+                                          slug=f'category-{i}')
+                  for i in range(2)]
+    genres = [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+              for i in range(3)]
+    titles = []
+    for i in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000 + i % 3,
+            category=categories[i % 2], description='Описание')
+        title.genre.set(genres[:1 + i % 3])
+        titles.append(title)
+    reviews = [Review.objects.create(title=titles[0], author=author,
+                                     text='Отзыв', score=5 + i)
+               for i, author in enumerate(authors)]
+    for author in authors:
+        Comment.objects.create(review=reviews[0], author=author,
+                               text='Комментарий')
+    return titles, reviews
@@ -0,0 +1,139 @@
+"""
+Планы запросов горячих эндпоинтов: EXPLAIN запросов к основной
+таблице эндпоинта должен использовать ожидаемый индекс, без полного
+просмотра таблицы и без сортировки, если она не разрешена.
+"""
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import CustomUser
+
+# Признаки плохого плана для каждой СУБД
+SORT_MARKERS = {
+    'sqlite': ('USE TEMP B-TREE FOR ORDER BY',),
+    'postgresql': ('Sort  (', 'Sort (', 'Incremental Sort'),
+}
+SCAN_MARKERS = {
+    'sqlite': 'SCAN {table}',
+    'postgresql': 'Seq Scan on {table}',
+}
+
+
+@pytest.fixture
+def hot_catalog(db):
+    """Каталог, на котором планировщику выгоднее индекс, чем просмотр."""
+    categories = Category.objects.bulk_create([
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(20)])
+    categories = list(Category.objects.all())
+    Genre.objects.bulk_create([
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(30)])
+    genres = list(Genre.objects.all())
+    Title.objects.bulk_create([
+        Title(name=f'Произведение {i}', year=1950 + i % 70,
+              category=categories[i % len(categories)])
+        for i in range(1000)])
+    title_ids = list(Title.objects.values_list('pk', flat=True))
+    Title.genre.through.objects.bulk_create([
+        Title.genre.through(title_id=pk, genre_id=genres[
+            (pk + shift) % len(genres)].pk)
+        for pk in title_ids for shift in (0, 7)])
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'user{i}', email=f'user{i}@example.com')
+        for i in range(10)])
+    user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+    Review.objects.bulk_create([
+        Review(title_id=pk, author_id=user_id, text='Отзыв', score=7)
+        for pk in title_ids for user_id in user_ids], batch_size=5000)
+    review_ids = list(Review.objects.values_list('pk', flat=True)[:100])
+    Comment.objects.bulk_create([
+        Comment(review_id=pk, author_id=user_id, text='Комментарий')
+        for pk in review_ids for user_id in user_ids], batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    review = Review.objects.get(pk=review_ids[0])
+    reviews = f'/api/v1/titles/{review.title_id}/reviews/'
+    return {
+        'reviews': reviews,
+        'comments': f'{reviews}{review.pk}/comments/',
+        'category': categories[0].slug,
+        'genre': genres[0].slug,
+    }
+
+
+# Эндпоинт, основная таблица, ожидаемый индекс и допустима ли сортировка.
+# Порядок по id произведения не выводится из индекса таблицы связей,
+# поэтому для ?genre= сортируются только отобранные по жанру строки.
+ENDPOINTS = {
+    'review_list': (
+        '{reviews}', 'reviews_review', 'review_title_pub_date_idx', False),
+    'review_list_cursor': (
+        '{reviews}?pagination=cursor', 'reviews_review',
+        'review_title_pub_date_idx', False),
+    'comment_list': (
+        '{comments}', 'reviews_comment', 'comment_review_pub_date_idx',
+        False),
+    'comment_list_cursor': (
+        '{comments}?pagination=cursor', 'reviews_comment',
+        'comment_review_pub_date_idx', False),
+    'title_list_category_year': (
+        '/api/v1/titles/?category={category}&year=1950', 'reviews_title',
+        'title_category_year_idx', False),
+    'title_list_genre': (
+        '/api/v1/titles/?genre={genre}', 'reviews_title',
+        'title_genre_genre_title_idx', True),
+}
+
+
+@contextmanager
+def capture_selects(table):
+    """Собирает SQL и параметры SELECT-запросов к таблице внутри блока."""
+    queries = []
+    source = f'FROM {connection.ops.quote_name(table)}'
+
+    def wrapper(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT') and source in sql:
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def explain(sql, params):
+    prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+              else 'EXPLAIN ')
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [' '.join(str(column) for column in row)
+                for row in cursor.fetchall()]
+
+
+def find_problems(plan, table, sort_allowed):
+    scan = SCAN_MARKERS[connection.vendor].format(table=table)
+    problems = []
+    for line in plan:
+        if any(marker in line for marker in SORT_MARKERS[connection.vendor]):
+            if not sort_allowed:
+                problems.append(line.strip())
+        # «SCAN t USING INDEX» в SQLite — упорядоченный обход индекса
+        elif (line.rstrip().endswith(scan) or f'{scan} ' in line
+              ) and 'USING' not in line:
+            problems.append(line.strip())
+    return problems
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_endpoint_uses_index(client, hot_catalog, endpoint):
+    url, table, index, sort_allowed = ENDPOINTS[endpoint]
+    with capture_selects(table) as queries:
+        response = client.get(url.format(**hot_catalog))
+    assert response.status_code == 200
+    plans = [explain(sql, params) for sql, params in queries]
+    assert plans, f'нет запросов к {table}'
+    assert any(index in line for plan in plans for line in plan), plans
+    assert [problem for plan in plans
+            for problem in find_problems(plan, table, sort_allowed)] == []
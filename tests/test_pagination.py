@@ -0,0 +1,43 @@
+"""
+Пагинация по курсору всегда идёт по (pub_date, id), какие бы
+сортировку и поиск ни запросили.
+"""
+from urllib.parse import quote
+
+import pytest
+
+
+@pytest.fixture
+def reviews_url(catalog):
+    titles, _ = catalog
+    return f'/api/v1/titles/{titles[0].pk}/reviews/'
+
+
+def pub_date_order(results):
+    return sorted(results, key=lambda item: (item['pub_date'], item['id']),
+                  reverse=True)
+
+
+@pytest.mark.django_db
+def test_cursor_with_search(client, reviews_url):
+    response = client.get(
+        f'{reviews_url}?search={quote("Отзыв")}&pagination=cursor'
+        f'&page_size=2')
+    assert response.status_code == 200
+    first = response.json()
+    assert len(first['results']) == 2
+    assert first['results'] == pub_date_order(first['results'])
+    second = client.get(first['next']).json()
+    assert len(second['results']) == 1
+
+
+@pytest.mark.django_db
+def test_cursor_ignores_ordering(client, reviews_url):
+    response = client.get(f'{reviews_url}?ordering=comments_count'
+                          f'&pagination=cursor&page_size=2')
+    assert response.status_code == 200
+    first = response.json()
+    second = client.get(first['next']).json()
+    results = first['results'] + second['results']
+    assert results == pub_date_order(results)
+    assert len({item['id'] for item in results}) == 3
@@ -0,0 +1,167 @@
+"""
+Число запросов к базе на страницу списка не зависит от размера
+страницы: связанные объекты загружаются пачкой, а не по одному.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from reviews.admin import TitleAdmin
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture(params=(2, 5, 50))
+def page_size(request, monkeypatch):
+    monkeypatch.setattr(PageNumberPagination, 'page_size', request.param)
+    return request.param
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('catalog')
+def test_title_list_queries(client, django_assert_num_queries, page_size):
+    # Число произведений, страница и жанры страницы
+    with django_assert_num_queries(3):
+        response = client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == min(page_size, 12)
+
+
+@pytest.mark.django_db
+def test_review_list_queries(client, catalog, django_assert_num_queries,
+                             page_size):
+    titles, _ = catalog
+    # Число отзывов и страница вместе с авторами
+    with django_assert_num_queries(2):
+        response = client.get(f'/api/v1/titles/{titles[0].pk}/reviews/')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == min(page_size, 3)
+
+
+@pytest.mark.django_db
+def test_comment_list_queries(client, catalog, django_assert_num_queries,
+                              page_size):
+    titles, reviews = catalog
+    with django_assert_num_queries(2):
+        response = client.get(f'/api/v1/titles/{titles[0].pk}/reviews/'
+                              f'{reviews[0].pk}/comments/')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == min(page_size, 3)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('page_size', (1, 2, 50))
+def test_cursor_list_queries(client, catalog, django_assert_num_queries,
+                             page_size):
+    titles, reviews = catalog
+    reviews_url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+    for url in (reviews_url, f'{reviews_url}{reviews[0].pk}/comments/'):
+        # Курсор обходится без COUNT(*)
+        with django_assert_num_queries(1):
+            response = client.get(
+                f'{url}?pagination=cursor&page_size={page_size}')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == min(page_size, 3)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('catalog')
+def test_missing_title_reviews(client, django_assert_num_queries):
+    # Пустой список: число отзывов и проверка произведения
+    with django_assert_num_queries(2):
+        response = client.get('/api/v1/titles/0/reviews/')
+    assert response.status_code == 404
+
+
+def count_queries(action):
+    with CaptureQueriesContext(connection) as context:
+        action()
+    return len(context.captured_queries)
+
+
+def add_reviews(django_user_model, title, count):
+    return [Review.objects.create(
+        title=title, text='Отзыв', score=7,
+        author=django_user_model.objects.create(
+            username=f'reader{title.pk}-{i}',
+            email=f'reader{title.pk}-{i}@example.com'))
+        for i in range(count)]
+
+
+@pytest.mark.django_db
+def test_cascade_delete_queries(catalog, django_user_model):
+    # Каскадное удаление не меняет счётчики удаляемого родителя
+    # по одной строке: число запросов не зависит от числа отзывов
+    # и комментариев
+    titles, _ = catalog
+    add_reviews(django_user_model, titles[1], 2)
+    add_reviews(django_user_model, titles[2], 30)
+    assert count_queries(titles[1].delete) == count_queries(
+        titles[2].delete)
+
+    reviews = add_reviews(django_user_model, titles[3], 2)
+    for author in django_user_model.objects.all()[:30]:
+        Comment.objects.create(review=reviews[1], author=author, text='К')
+    Comment.objects.create(review=reviews[0], author=reviews[0].author,
+                           text='К')
+    assert count_queries(reviews[0].delete) == count_queries(
+        reviews[1].delete)
+
+
+@pytest.mark.django_db
+def test_author_delete_recounts(catalog):
+    titles, reviews = catalog
+    reviews[1].author.delete()
+    title = Title.objects.get(pk=titles[0].pk)
+    assert (title.reviews_count, title.score_sum) == (2, 5 + 7)
+    assert Review.objects.get(pk=reviews[0].pk).comments_count == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('catalog')
+@pytest.mark.parametrize('url,count', (
+    ('/api/v1/categories/', 2), ('/api/v1/genres/', 3)))
+def test_catalog_list_queries(client, django_assert_num_queries, page_size,
+                              url, count):
+    # Число объектов и страница
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == min(page_size, count)
+
+
+
+@pytest.fixture
+def admin_user(django_user_model):
+    return django_user_model.objects.create(
+        username='admin', email='admin@example.com', role='admin',
+        is_staff=True, is_superuser=True)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('authors')
+def test_user_list_queries(admin_user, django_assert_num_queries,
+                           page_size):
+    client = APIClient()
+    client.force_authenticate(admin_user)
+    # Число пользователей и страница
+    with django_assert_num_queries(2):
+        response = client.get('/api/v1/users/')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == min(page_size, 4)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('catalog')
+@pytest.mark.parametrize('per_page', (2, 5, 50))
+def test_title_admin_queries(client, admin_user, monkeypatch,
+                             django_assert_num_queries, per_page):
+    monkeypatch.setattr(TitleAdmin, 'list_per_page', per_page)
+    client.force_login(admin_user)
+    # Сессия, пользователь, два COUNT(*), категории и жанры
+    # фильтров, страница с категориями и жанры страницы
+    with django_assert_num_queries(8):
+        response = client.get('/admin/reviews/title/')
+    assert response.status_code == 200
+    assert len(response.context['cl'].result_list) == min(per_page, 12)
@@ -0,0 +1,125 @@
+"""
+Маршрутизация чтения на реплики. Реплики — два файла SQLite, снятые
+с основной базы копией до записи, то есть отстающие на одну запись.
+"""
+import sqlite3
+from contextlib import ExitStack, closing
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import ClaimsRefreshToken
+from api.routers import ReplicaRouter
+from reviews.models import Category, RatingDistribution, Title
+from users.models import CustomUser
+
+REPLICAS = ('replica_1', 'replica_2')
+
+
+@pytest.fixture
+def replicas(transactional_db, tmp_path, monkeypatch):
+    """Подключает две реплики-файла, как DB_REPLICAS в настройках."""
+    for replica_router in router.routers:
+        if isinstance(replica_router, ReplicaRouter):
+            monkeypatch.setattr(replica_router, 'replicas', list(REPLICAS))
+    # Алиасы убираются до того, как pytest-django закроет тестовую базу,
+    # поэтому без monkeypatch
+    for alias in REPLICAS:
+        connections.databases[alias] = dict(
+            connection.settings_dict, NAME=str(tmp_path / f'{alias}.sqlite3'),
+            TEST={'MIRROR': 'default'})
+    try:
+        yield REPLICAS
+    finally:
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+
+
+def copy_to_replicas():
+    """Снимок основной базы, как у отстающей реплики."""
+    connection.ensure_connection()
+    for alias in REPLICAS:
+        with closing(sqlite3.connect(
+                connections.databases[alias]['NAME'])) as replica:
+            connection.connection.backup(replica)
+
+
+def token_for(username):
+    user = CustomUser.objects.create(username=username,
+                                     email=f'{username}@example.com')
+    return str(ClaimsRefreshToken.for_user(user).access_token)
+
+
+def routed(client, method, url, token, data=None):
+    """Ответ и алиасы баз, к которым были запросы."""
+    with ExitStack() as stack:
+        contexts = {alias: stack.enter_context(
+            CaptureQueriesContext(connections[alias]))
+            for alias in connections}
+        response = client.generic(
+            method, url, data or '', content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {token}')
+    return response, {alias for alias, context in contexts.items()
+                      if len(context)}
+
+
+def test_replica_routing(replicas):
+    category = Category.objects.create(name='Фильмы', slug='movie')
+    title = Title.objects.create(name='Фильм', year=2000, category=category)
+    author, reader = token_for('author'), token_for('reader')
+    url = f'/api/v1/titles/{title.pk}/reviews/'
+    copy_to_replicas()
+    cache.clear()
+    client = Client()
+
+    used = set()
+    for _ in range(50):
+        used |= routed(client, 'GET', url, reader)[1]
+    assert used == set(replicas)
+
+    response, aliases = routed(client, 'POST', url, author,
+                               '{"text": "Отзыв", "score": 7}')
+    assert response.status_code == 201
+    assert aliases == {'default'}
+
+    # Автор сразу после записи читает с default и видит свой отзыв
+    response, aliases = routed(client, 'GET', url, author)
+    assert aliases == {'default'}
+    assert response.json()['count'] == 1
+
+    # Остальные читают с отстающей реплики
+    response, aliases = routed(client, 'GET', url, reader)
+    assert aliases and 'default' not in aliases
+    assert response.json()['count'] == 0
+
+    # Промах кеша каталога после записи идёт в default
+    _, aliases = routed(client, 'GET', '/api/v1/titles/', reader)
+    assert aliases == {'default'}
+
+    # Окно REPLICA_STICKY_SECONDS истекло
+    cache.clear()
+    _, aliases = routed(client, 'GET', url, author)
+    assert aliases and 'default' not in aliases
+
+
+def test_missing_distribution_on_replica(replicas, client):
+    category = Category.objects.create(name='Фильмы', slug='movie')
+    title = Title.objects.create(name='Фильм', year=2000, category=category)
+    author = CustomUser.objects.create(username='author',
+                                       email='author@example.com')
+    title.reviews.create(author=author, text='Отзыв', score=8)
+    # Распределение строится при первом запросе, а реплика его не видит
+    RatingDistribution.objects.all().delete()
+    copy_to_replicas()
+
+    response = client.get(
+        f'/api/v1/titles/{title.pk}/rating-distribution/')
+    assert response.status_code == 200
+    assert response.json()['count'] == 1
+    assert RatingDistribution.objects.using('default').filter(
+        title=title).exists()
@@ -0,0 +1,72 @@
+"""
+Быстрые сериализаторы списков отдают те же байты, что сериализаторы
+DRF с JSONRenderer. Скорость сравнивает benchmarks.serializers.
+"""
+import pytest
+from django.core.cache import cache
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from reviews.models import Comment, Review, Title
+
+# Строки, на которых легко разойтись с json.dumps
+EDGE_CASE_TEXT = ('Кавычки " и \\ слэш, разделитель \u2028 строк, '
+                  'эмодзи 🎬 <b>')
+
+
+@pytest.fixture
+def parity_urls(catalog, authors):
+    titles, reviews = catalog
+    # Произведение без отзывов, жанров и описания и отзыв со сложным текстом
+    Title.objects.create(name=EDGE_CASE_TEXT, year=2000,
+                         category=titles[0].category)
+    edge_title = Title.objects.create(
+        name='Граничный случай', year=2001, description=EDGE_CASE_TEXT,
+        category=titles[1].category)
+    edge_title.genre.set(titles[2].genre.all())
+    edge_review = Review.objects.create(title=edge_title, author=authors[0],
+                                        text=EDGE_CASE_TEXT, score=10)
+    Comment.objects.create(review=edge_review, author=authors[0],
+                           text=EDGE_CASE_TEXT)
+
+    base = '/api/v1/titles/'
+    reviews_url = f'{base}{titles[0].pk}/reviews/'
+    comments_url = f'{reviews_url}{reviews[0].pk}/comments/'
+    edge_reviews_url = f'{base}{edge_title.pk}/reviews/'
+    return (
+        base,
+        f'{base}?page=2',
+        f'{base}?ordering=-rating',
+        f'{base}?ordering=name&page=2',
+        f'{base}?genre=genre-1&category=category-0',
+        f'{base}?year=2000',
+        f'{base}?search=Произведение',
+        reviews_url,
+        f'{reviews_url}?page=2',
+        f'{reviews_url}?pagination=cursor&page_size=2',
+        f'{reviews_url}?ordering=-score',
+        edge_reviews_url,
+        comments_url,
+        f'{comments_url}?pagination=cursor',
+        f'{edge_reviews_url}{edge_review.pk}/comments/',
+    )
+
+
+@pytest.mark.django_db
+def test_fast_serializers_parity(client, monkeypatch, parity_urls):
+    # Маленькие страницы, чтобы у отзывов была вторая
+    monkeypatch.setattr(PageNumberPagination, 'page_size', 2)
+    fast = {}
+    for url in parity_urls:
+        cache.clear()
+        fast[url] = client.get(url)
+
+    for viewset in (TitleViewSet, ReviewViewSet, CommentViewSet):
+        monkeypatch.setattr(viewset, 'fast_serializer_class', None)
+        monkeypatch.setattr(viewset, 'renderer_classes', [JSONRenderer])
+    for url in parity_urls:
+        cache.clear()
+        drf = client.get(url)
+        assert fast[url].status_code == drf.status_code == 200, url
+        assert fast[url].content == drf.content, url